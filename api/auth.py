@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr, Field
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
+import asyncio
 import secrets
 import hashlib
 import jwt
@@ -19,8 +20,12 @@ from services.rate_limiter import check_dashboard_burst_limit, record_dashboard_
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing (lower BCRYPT_ROUNDS only for local development/test fixtures)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=int(os.getenv("BCRYPT_ROUNDS", "12"))
+)
 
 # JWT settings
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
@@ -267,16 +272,17 @@ async def get_current_user_from_api_key(
     
     return user
 
-def _get_user_tier_limits(user: User, db: Session) -> tuple[SubscriptionTier, dict]:
-    """Get user's subscription tier and usage limits"""
-    # Import here to avoid circular imports
-    from services.paddle_service import paddle_service
-    
-    # Check if user has an active Paddle subscription
-    paddle_subscription = db.query(PaddleSubscription).filter(
+def _get_active_subscription(user: User, db: Session) -> Optional[PaddleSubscription]:
+    """Get user's active Paddle subscription, if any"""
+    return db.query(PaddleSubscription).filter(
         PaddleSubscription.user_id == user.id,
         PaddleSubscription.status == SubscriptionStatus.ACTIVE
     ).first()
+
+def _get_user_tier_limits(paddle_subscription: Optional[PaddleSubscription]) -> tuple[SubscriptionTier, dict]:
+    """Get user's subscription tier and usage limits"""
+    # Import here to avoid circular imports
+    from services.paddle_service import paddle_service
     
     if paddle_subscription:
         tier = paddle_subscription.tier
@@ -296,15 +302,10 @@ def _get_current_usage(user_id: int, usage_type: str, period_start: datetime, db
         UsageRecord.created_at >= period_start
     ).scalar() or 0
 
-def _calculate_billing_period(user: User, db: Session) -> tuple[datetime, datetime]:
+def _calculate_billing_period(paddle_subscription: Optional[PaddleSubscription]) -> tuple[datetime, datetime]:
     """Calculate billing period for user"""
     from services.paddle_service import paddle_service
     
-    paddle_subscription = db.query(PaddleSubscription).filter(
-        PaddleSubscription.user_id == user.id,
-        PaddleSubscription.status == SubscriptionStatus.ACTIVE
-    ).first()
-    
     if paddle_subscription:
         return paddle_service.calculate_billing_period(paddle_subscription)
     else:
@@ -317,16 +318,8 @@ def _calculate_billing_period(user: User, db: Session) -> tuple[datetime, dateti
             next_month = month_start.replace(month=now.month + 1)
         return month_start, next_month
 
-def _record_usage(user: User, usage_type: str, endpoint: str, period_start: datetime, period_end: datetime, db: Session):
+def _record_usage(user: User, subscription_id: Optional[int], usage_type: str, endpoint: str, period_start: datetime, period_end: datetime, db: Session):
     """Record usage event"""
-    # Get subscription ID if exists
-    paddle_subscription = db.query(PaddleSubscription).filter(
-        PaddleSubscription.user_id == user.id,
-        PaddleSubscription.status == SubscriptionStatus.ACTIVE
-    ).first()
-    
-    subscription_id = paddle_subscription.id if paddle_subscription else None
-    
     usage_record = UsageRecord(
         user_id=user.id,
         subscription_id=subscription_id,
@@ -360,20 +353,8 @@ async def require_active_subscription_with_usage_tracking(
     Raises:
         HTTPException: If subscription inactive or usage limits exceeded
     """
-    # Get user's tier and limits
-    tier, limits = _get_user_tier_limits(user, db)
-    
-    # Calculate billing period
-    period_start, period_end = _calculate_billing_period(user, db)
-    
-    # Check current usage
-    current_usage = _get_current_usage(user.id, usage_type, period_start, db)
-    
-    # Get usage limit for this type
-    usage_limit_key = f"{usage_type}_per_month"
-    usage_limit = limits.get(usage_limit_key, 0)
-    
-    # Special handling for dashboard endpoints - Redis-based burst limiting
+    # Special handling for dashboard endpoints - Redis-based burst limiting.
+    # Checked before any database work so throttled requests are rejected cheaply.
     dashboard_endpoints = ["general_api", "data_summary", "jobs_list", "subscription_status"]
     if endpoint in dashboard_endpoints:
         # Check burst limit using Redis sliding window (accurate counting)
@@ -396,6 +377,22 @@ async def require_active_subscription_with_usage_tracking(
         # Record this request in Redis for accurate burst tracking
         await record_dashboard_request(user.id, endpoint)
     
+    # Single subscription lookup shared by tier, billing period and usage recording
+    paddle_subscription = _get_active_subscription(user, db)
+    
+    # Get user's tier and limits
+    tier, limits = _get_user_tier_limits(paddle_subscription)
+    
+    # Calculate billing period
+    period_start, period_end = _calculate_billing_period(paddle_subscription)
+    
+    # Check current usage
+    current_usage = _get_current_usage(user.id, usage_type, period_start, db)
+    
+    # Get usage limit for this type
+    usage_limit_key = f"{usage_type}_per_month"
+    usage_limit = limits.get(usage_limit_key, 0)
+    
     # Check monthly limits with 10% buffer for dashboard usage
     effective_limit = int(usage_limit * 1.1) if endpoint in dashboard_endpoints else usage_limit
     
@@ -425,7 +422,11 @@ async def require_active_subscription_with_usage_tracking(
     # Record the usage (but not for cached dashboard calls)
     if not (endpoint in dashboard_endpoints and current_usage > 0 and (current_usage % 5) != 0):
         # Only record every 5th dashboard call to reduce database load
-        _record_usage(user, usage_type, endpoint, period_start, period_end, db)
+        _record_usage(
+            user,
+            paddle_subscription.id if paddle_subscription else None,
+            usage_type, endpoint, period_start, period_end, db
+        )
     
     # Add usage info to response headers for API consumers
     user._usage_info = {
@@ -516,7 +517,8 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = hash_password(user_data.password)
+    # bcrypt is CPU-bound; hash in a worker thread so the event loop keeps serving
+    hashed_password = await asyncio.to_thread(hash_password, user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username or user_data.email.split("@")[0],
@@ -543,7 +545,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     """Login and receive access token"""
     user = db.query(User).filter(User.email == user_credentials.email).first()
     
-    if not user or not verify_password(user_credentials.password, user.password_hash):
+    if not user or not await asyncio.to_thread(verify_password, user_credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -696,16 +698,14 @@ async def create_test_user(
     existing_user = db.query(User).filter(User.email == test_email).first()
     if existing_user:
         # Update existing user to ensure it's active with known password
-        existing_user.password_hash = hash_password(test_password)
+        existing_user.password_hash = await asyncio.to_thread(hash_password, test_password)
         existing_user.is_active = True
         existing_user.subscription_status = SubscriptionStatus.ACTIVE  # Give active subscription for testing
-        db.commit()
-        db.refresh(existing_user)
         
-        # Create a new API key for the user (atomic operation)
+        # Create a new API key for the user
         raw_key, hashed_key = generate_api_key()
         
-        # Delete old API keys and create new one atomically
+        # Delete old API keys and create new one; committed with the user update
         db.query(APIKey).filter(APIKey.user_id == existing_user.id).delete(synchronize_session=False)
         
         db_api_key = APIKey(
@@ -729,7 +729,7 @@ async def create_test_user(
         }
     
     # Create new test user
-    hashed_password = hash_password(test_password)
+    hashed_password = await asyncio.to_thread(hash_password, test_password)
     db_user = User(
         email=test_email,
         username=test_username,
@@ -739,8 +739,7 @@ async def create_test_user(
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    db.flush()  # Assigns db_user.id; user and API key are committed together
     
     # Create API key for the test user
     raw_key, hashed_key = generate_api_key()
@@ -1,14 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response, Query
+from sqlalchemy.orm import Session, defer
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 from pydantic import BaseModel, Field
 import logging
 import json
 import csv
 import io
-import pandas as pd
 import uuid
+from abc import ABC, abstractmethod
 
 from models.database import get_db
 from models.models import CollectionJob, RedditPost, RedditComment, JobStatus, User
@@ -18,6 +18,108 @@ from api.auth import require_export_limit, require_feature
 router = APIRouter(prefix="/api/export", tags=["export"])
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round trip when streaming export queries
+EXPORT_BATCH_SIZE = 1000
+
+# Export format encoders
+class ExportEncoder(ABC):
+    """Base class for export format encoders"""
+    
+    media_type: str = "application/octet-stream"
+    extension: str = ""
+    
+    @abstractmethod
+    def encode(self, rows: Any) -> Union[str, bytes]:
+        """Encode a list of flat records"""
+    
+    def encode_job(self, export_data: Dict[str, Any]) -> Union[str, bytes]:
+        """
+        Encode a job export ({"job_metadata": ..., "posts": [...]}).
+        
+        Tabular formats export just the posts, with nested comments
+        flattened to a count.
+        """
+        rows = []
+        for post in export_data["posts"]:
+            flat_post = post.copy()
+            if "comments" in flat_post:
+                flat_post["comment_count"] = len(flat_post.pop("comments"))
+            rows.append(flat_post)
+        return self.encode(rows)
+
+class JSONExportEncoder(ExportEncoder):
+    """Pretty-printed JSON document"""
+    
+    media_type = "application/json"
+    extension = "json"
+    
+    def encode(self, rows: Any) -> str:
+        return json.dumps(rows, indent=2)
+    
+    def encode_job(self, export_data: Dict[str, Any]) -> str:
+        # The nested document is exported as-is
+        return self.encode(export_data)
+
+class JSONLExportEncoder(ExportEncoder):
+    """One JSON object per line"""
+    
+    media_type = "application/json"
+    extension = "jsonl"
+    
+    def encode(self, rows: List[Dict[str, Any]]) -> str:
+        return "\n".join(map(json.dumps, rows))
+    
+    def encode_job(self, export_data: Dict[str, Any]) -> str:
+        # Metadata on the first line, then one post per line
+        return self.encode([export_data["job_metadata"], *export_data["posts"]])
+
+class CSVExportEncoder(ExportEncoder):
+    """Comma-separated values with a header row taken from the first record"""
+    
+    media_type = "text/csv"
+    extension = "csv"
+    
+    def encode(self, rows: List[Dict[str, Any]]) -> str:
+        output = io.StringIO()
+        if rows:
+            writer = csv.DictWriter(output, fieldnames=rows[0].keys())
+            writer.writeheader()
+            writer.writerows(rows)
+        return output.getvalue()
+
+class ParquetExportEncoder(ExportEncoder):
+    """Apache Parquet file built from an Arrow table"""
+    
+    media_type = "application/octet-stream"
+    extension = "parquet"
+    
+    def encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        # Imported lazily so CSV/JSON-only workers never pay for pyarrow
+        import pyarrow as pa
+        import pyarrow.parquet as papq
+        
+        table = pa.Table.from_pylist(rows)
+        buffer = io.BytesIO()
+        papq.write_table(table, buffer)
+        return buffer.getvalue()
+
+EXPORT_ENCODERS: Dict[str, ExportEncoder] = {
+    "csv": CSVExportEncoder(),
+    "json": JSONExportEncoder(),
+    "jsonl": JSONLExportEncoder(),
+    "parquet": ParquetExportEncoder(),
+}
+
+def get_export_encoder(format: str) -> ExportEncoder:
+    """Resolve an export format name to its encoder, or raise 400"""
+    encoder = EXPORT_ENCODERS.get(format.lower())
+    if encoder is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Supported formats: {', '.join(EXPORT_ENCODERS)}"
+        )
+    return encoder
+
 # Request/Response Models
 class ExportRequest(BaseModel):
     """Request model for data export"""
@@ -98,11 +200,11 @@ class ExportResponse(BaseModel):
 
 # Export Endpoints
 
-@router.post("/posts/{format}")
+@router.post("/posts/{format}", response_class=Response, response_model=None)
 async def export_posts(
     format: str,
     export_request: PostQueryRequest,
-    response: Response,
+    include_body: bool = Query(True, description="Include post selftext in the export"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_export_limit)
 ):
@@ -110,11 +212,15 @@ async def export_posts(
     Export posts in specified format (csv, json, jsonl, parquet)
     
     Uses the same filtering options as the Data API posts query
-    but returns the data in the requested export format.
+    but returns the data in the requested export format. Set
+    include_body=false to skip the selftext column, which usually
+    dominates row size.
     """
     try:
-        if format.lower() not in ["csv", "json", "jsonl", "parquet"]:
-            raise HTTPException(status_code=400, detail="Supported formats: csv, json, jsonl, parquet")
+        encoder = get_export_encoder(format)
+        
+        # Filename timestamp, computed once per request
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
         # Use the same query logic as Data API
         from api.data import query_posts
@@ -143,23 +249,26 @@ async def export_posts(
         if export_request.created_before:
             query_obj = query_obj.filter(RedditPost.created_utc <= export_request.created_before)
         
+        # Don't pull selftext blobs from the database unless they are exported
+        if not include_body:
+            query_obj = query_obj.options(defer(RedditPost.selftext))
+        
         # Apply limit
         if export_request.limit:
             query_obj = query_obj.limit(export_request.limit)
         
-        posts = query_obj.all()
-        
-        if not posts:
+        # Cheap single-row probe so empty results 404 before any rows are loaded
+        if query_obj.with_entities(RedditPost.id).limit(1).first() is None:
             raise HTTPException(status_code=404, detail="No posts found matching criteria")
         
-        # Convert to export format
+        # Convert to export format, fetching rows in batches
         posts_data = []
-        for post in posts:
+        for post in query_obj.yield_per(EXPORT_BATCH_SIZE):
             post_dict = {
                 "id": post.id,
                 "reddit_id": post.reddit_id,
                 "title": post.title,
-                "selftext": post.selftext,
+                **({"selftext": post.selftext} if include_body else {}),
                 "url": post.url,
                 "permalink": post.permalink,
                 "subreddit": post.subreddit,
@@ -180,45 +289,14 @@ async def export_posts(
             }
             posts_data.append(post_dict)
         
-        # Generate export based on format
-        if format.lower() == "json":
-            content = json.dumps(posts_data, indent=2)
-            media_type = "application/json"
-            filename = f"posts_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            
-        elif format.lower() == "jsonl":
-            content = "\n".join(json.dumps(post) for post in posts_data)
-            media_type = "application/json"
-            filename = f"posts_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
-            
-        elif format.lower() == "csv":
-            output = io.StringIO()
-            if posts_data:
-                writer = csv.DictWriter(output, fieldnames=posts_data[0].keys())
-                writer.writeheader()
-                writer.writerows(posts_data)
-            content = output.getvalue()
-            media_type = "text/csv"
-            filename = f"posts_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            
-        elif format.lower() == "parquet":
-            # Convert to pandas DataFrame and export as Parquet
-            df = pd.DataFrame(posts_data)
-            buffer = io.BytesIO()
-            df.to_parquet(buffer, index=False)
-            content = buffer.getvalue()
-            media_type = "application/octet-stream"
-            filename = f"posts_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
-        
-        # Set response headers
-        response.headers["Content-Disposition"] = f"attachment; filename={filename}"
-        response.headers["Content-Length"] = str(len(content))
+        content = encoder.encode(posts_data)
+        filename = f"posts_export_{timestamp}.{encoder.extension}"
         
         logger.info(f"Exported {len(posts_data)} posts in {format} format")
         
         return Response(
             content=content,
-            media_type=media_type,
+            media_type=encoder.media_type,
             headers={
                 "Content-Disposition": f"attachment; filename={filename}",
                 "X-Export-Count": str(len(posts_data)),
@@ -232,11 +310,11 @@ async def export_posts(
         logger.error(f"Export failed: {e}")
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
 
-@router.post("/comments/{format}")
+@router.post("/comments/{format}", response_class=Response, response_model=None)
 async def export_comments(
     format: str,
     export_request: CommentQueryRequest,
-    response: Response,
+    include_body: bool = Query(True, description="Include comment body text in the export"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_export_limit)
 ):
@@ -244,11 +322,14 @@ async def export_comments(
     Export comments in specified format (csv, json, jsonl, parquet)
     
     Uses the same filtering options as the Data API comments query
-    but returns the data in the requested export format.
+    but returns the data in the requested export format. Set
+    include_body=false to skip the comment body column.
     """
     try:
-        if format.lower() not in ["csv", "json", "jsonl", "parquet"]:
-            raise HTTPException(status_code=400, detail="Supported formats: csv, json, jsonl, parquet")
+        encoder = get_export_encoder(format)
+        
+        # Filename timestamp, computed once per request
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
         # Build query (simplified version of Data API logic)
         query_obj = db.query(RedditComment).join(RedditPost)
@@ -263,21 +344,23 @@ async def export_comments(
         if export_request.min_score is not None:
             query_obj = query_obj.filter(RedditComment.score >= export_request.min_score)
         
+        if not include_body:
+            query_obj = query_obj.options(defer(RedditComment.body))
+        
         if export_request.limit:
             query_obj = query_obj.limit(export_request.limit)
         
-        comments = query_obj.all()
-        
-        if not comments:
+        # Cheap single-row probe so empty results 404 before any rows are loaded
+        if query_obj.with_entities(RedditComment.id).limit(1).first() is None:
             raise HTTPException(status_code=404, detail="No comments found matching criteria")
         
-        # Convert to export format
+        # Convert to export format, fetching rows in batches
         comments_data = []
-        for comment in comments:
+        for comment in query_obj.yield_per(EXPORT_BATCH_SIZE):
             comment_dict = {
                 "id": comment.id,
                 "reddit_id": comment.reddit_id,
-                "body": comment.body,
+                **({"body": comment.body} if include_body else {}),
                 "parent_id": comment.parent_id,
                 "post_id": comment.post_id,
                 "author": comment.author,
@@ -297,40 +380,14 @@ async def export_comments(
             }
             comments_data.append(comment_dict)
         
-        # Generate export based on format
-        if format.lower() == "json":
-            content = json.dumps(comments_data, indent=2)
-            media_type = "application/json"
-            filename = f"comments_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            
-        elif format.lower() == "jsonl":
-            content = "\n".join(json.dumps(comment) for comment in comments_data)
-            media_type = "application/json"
-            filename = f"comments_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
-            
-        elif format.lower() == "csv":
-            output = io.StringIO()
-            if comments_data:
-                writer = csv.DictWriter(output, fieldnames=comments_data[0].keys())
-                writer.writeheader()
-                writer.writerows(comments_data)
-            content = output.getvalue()
-            media_type = "text/csv"
-            filename = f"comments_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            
-        elif format.lower() == "parquet":
-            df = pd.DataFrame(comments_data)
-            buffer = io.BytesIO()
-            df.to_parquet(buffer, index=False)
-            content = buffer.getvalue()
-            media_type = "application/octet-stream"
-            filename = f"comments_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
+        content = encoder.encode(comments_data)
+        filename = f"comments_export_{timestamp}.{encoder.extension}"
         
         logger.info(f"Exported {len(comments_data)} comments in {format} format")
         
         return Response(
             content=content,
-            media_type=media_type,
+            media_type=encoder.media_type,
             headers={
                 "Content-Disposition": f"attachment; filename={filename}",
                 "X-Export-Count": str(len(comments_data)),
@@ -344,7 +401,7 @@ async def export_comments(
         logger.error(f"Comment export failed: {e}")
         raise HTTPException(status_code=500, detail=f"Comment export failed: {str(e)}")
 
-@router.get("/job/{job_id}/{format}")
+@router.get("/job/{job_id}/{format}", response_class=Response, response_model=None)
 async def export_job_data(
     job_id: str,
     format: str,
@@ -359,8 +416,10 @@ async def export_job_data(
     in the specified format.
     """
     try:
-        if format.lower() not in ["csv", "json", "jsonl", "parquet"]:
-            raise HTTPException(status_code=400, detail="Supported formats: csv, json, jsonl, parquet")
+        encoder = get_export_encoder(format)
+        
+        # Filename timestamp, computed once per request
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
         # Verify job exists
         job = db.query(CollectionJob).filter(CollectionJob.job_id == job_id).first()
@@ -423,60 +482,15 @@ async def export_job_data(
             
             export_data["posts"].append(post_data)
         
-        # Generate export
-        if format.lower() == "json":
-            content = json.dumps(export_data, indent=2)
-            media_type = "application/json"
-            filename = f"job_{job_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            
-        elif format.lower() == "jsonl":
-            # For JSONL, flatten the structure
-            lines = []
-            lines.append(json.dumps(export_data["job_metadata"]))
-            for post in export_data["posts"]:
-                lines.append(json.dumps(post))
-            content = "\n".join(lines)
-            media_type = "application/json"
-            filename = f"job_{job_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
-            
-        elif format.lower() == "csv":
-            # For CSV, export just the posts data
-            output = io.StringIO()
-            if export_data["posts"]:
-                # Flatten nested data for CSV
-                flattened_posts = []
-                for post in export_data["posts"]:
-                    flat_post = post.copy()
-                    if "comments" in flat_post:
-                        flat_post["comment_count"] = len(flat_post["comments"])
-                        del flat_post["comments"]  # Remove nested data
-                    flattened_posts.append(flat_post)
-                
-                writer = csv.DictWriter(output, fieldnames=flattened_posts[0].keys())
-                writer.writeheader()
-                writer.writerows(flattened_posts)
-            content = output.getvalue()
-            media_type = "text/csv"
-            filename = f"job_{job_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            
-        elif format.lower() == "parquet":
-            # For Parquet, export just the posts as DataFrame
-            df = pd.DataFrame(export_data["posts"])
-            if "comments" in df.columns:
-                df["comment_count"] = df["comments"].apply(len)
-                df = df.drop("comments", axis=1)
-            
-            buffer = io.BytesIO()
-            df.to_parquet(buffer, index=False)
-            content = buffer.getvalue()
-            media_type = "application/octet-stream"
-            filename = f"job_{job_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
+        # Generate export; each encoder shapes the job document for its format
+        content = encoder.encode_job(export_data)
+        filename = f"job_{job_id}_{timestamp}.{encoder.extension}"
         
         logger.info(f"Exported job {job_id} data ({len(posts)} posts) in {format} format")
         
         return Response(
             content=content,
-            media_type=media_type,
+            media_type=encoder.media_type,
             headers={
                 "Content-Disposition": f"attachment; filename={filename}",
                 "X-Export-Job-ID": job_id,
@@ -1,19 +1,150 @@
 from fastapi import APIRouter, HTTPException, Query as FastAPIQuery, Depends, Form
-from typing import List, Optional, Dict, Any
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, date, timezone, timedelta
 from pydantic import BaseModel, Field
+import asyncio
+import orjson
+import re
 import time
+from itertools import chain
+from contextlib import aclosing
+from functools import lru_cache, partial
 import logging
 
 from services.data_collector import DataCollector
-from services.date_filter_fix import ImprovedDateFiltering
+from services.cache import TTLCache
 from models.models import User
 from api.auth import require_api_call_limit, require_feature
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/query", tags=["query"])
+router = APIRouter(prefix="/api/query", tags=["query"], default_response_class=ORJSONResponse)
 collector = DataCollector()
 
+# Maximum number of Reddit API calls in flight per request
+REDDIT_FETCH_CONCURRENCY = 8
+
+# Cross-request caches for slow-changing Reddit lookups in query_users
+user_info_cache = TTLCache(maxsize=4096, ttl_seconds=300)
+hot_posts_cache = TTLCache(maxsize=256, ttl_seconds=30)
+
+# Filtered results of recent identical queries, so bursts of the same query
+# (dashboard refreshes, retries) don't repeat the Reddit round trips
+query_result_cache = TTLCache(maxsize=128, ttl_seconds=90)
+
+def _query_cache_key(query_type: str, request: BaseModel) -> Tuple[str, bytes]:
+    """Stable cache key for a query request, ignoring the use_cache switch itself"""
+    return query_type, orjson.dumps(request.model_dump(exclude={'use_cache'}), option=orjson.OPT_SORT_KEYS)
+
+def _cached_query_response(query_type: str, request: BaseModel, results: List[Dict[str, Any]], start_time: float, filters_applied) -> ORJSONResponse:
+    """Build a query response from cached results; no Reddit calls were made"""
+    return ORJSONResponse({
+        "query_type": query_type,
+        "parameters": request.model_dump(exclude_none=True, exclude_defaults=True),
+        "results": results,
+        "count": len(results),
+        "execution_time_ms": (time.time() - start_time) * 1000,
+        "reddit_api_calls": 0,
+        "filters_applied": filters_applied
+    })
+
+# get_user_info lookups in flight, shared by concurrent requests for the same user
+user_info_inflight: Dict[str, asyncio.Task] = {}
+
+def _finish_user_lookup(cache_key: str, lookup: asyncio.Task) -> None:
+    """Cache a completed get_user_info lookup and drop it from the in-flight table"""
+    user_info_inflight.pop(cache_key, None)
+    if lookup.cancelled() or lookup.exception() is not None:
+        return
+    user_data = lookup.result()
+    if user_data:
+        user_info_cache.set(cache_key, user_data)
+
+def _spawn_bounded(coros, limit: int = REDDIT_FETCH_CONCURRENCY) -> List[asyncio.Task]:
+    """Schedule coroutines as tasks, at most `limit` running at a time, preserving order"""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        try:
+            async with semaphore:
+                return await coro
+        finally:
+            # No-op once awaited; avoids "never awaited" warnings if cancelled while queued
+            coro.close()
+
+    return [asyncio.create_task(run(coro)) for coro in coros]
+
+def _cancel_fetches(fetches: List[asyncio.Task]) -> None:
+    """Cancel unfinished fetch tasks and retrieve errors from finished ones"""
+    for fetch in fetches:
+        if not fetch.done():
+            fetch.cancel()
+        elif not fetch.cancelled():
+            # Mark the error as retrieved so asyncio doesn't log it as unhandled
+            fetch.exception()
+
+async def _gather_bounded(coros, limit: int = REDDIT_FETCH_CONCURRENCY) -> List[Any]:
+    """Run coroutines concurrently, at most `limit` at a time, preserving order"""
+    return await asyncio.gather(*_spawn_bounded(coros, limit))
+
+def _keyword_trie_regex(node: Dict[str, Any]) -> str:
+    """Render a keyword trie as a regex in which shared prefixes are matched once"""
+    if '' in node:
+        # A keyword ends here; any longer keyword sharing this prefix is redundant
+        return ''
+    branches = [re.escape(char) + _keyword_trie_regex(child) for char, child in sorted(node.items())]
+    return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+@lru_cache(maxsize=256)
+def _compile_trie_pattern(keywords: Tuple[str, ...]) -> re.Pattern:
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword.lower():
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return re.compile(_keyword_trie_regex(trie), re.IGNORECASE)
+
+def _compile_keyword_pattern(keywords: Optional[List[str]]) -> Optional[re.Pattern]:
+    """
+    Compile keywords into one case-insensitive pattern, so text is scanned
+    once. Keywords are merged into a prefix trie so each position tries one
+    branch per shared prefix rather than every keyword; compiled patterns
+    are reused across requests with the same keyword list.
+    """
+    if not keywords:
+        return None
+    return _compile_trie_pattern(tuple(keywords))
+
+async def _iter_filtered(fetches: List[asyncio.Task], keep, limit: int):
+    """
+    Drain fetch tasks in order, yielding items that pass `keep` until `limit`
+    is reached, then cancel fetches not yet finished. Items already seen (by
+    reddit_id) in an earlier batch are skipped; items without an id are kept.
+    """
+    seen_ids = set()
+    kept = 0
+    try:
+        for fetch in fetches:
+            for item in await fetch:
+                item_id = item.get('reddit_id')
+                if item_id is not None:
+                    if item_id in seen_ids:
+                        continue
+                    seen_ids.add(item_id)
+                if keep(item):
+                    yield item
+                    kept += 1
+                    if kept >= limit:
+                        return
+    finally:
+        _cancel_fetches(fetches)
+
+async def _take_filtered(fetches: List[asyncio.Task], keep, limit: int) -> List[Dict[str, Any]]:
+    """Collect _iter_filtered() into a list"""
+    async with aclosing(_iter_filtered(fetches, keep, limit)) as items:
+        return [item async for item in items]
+
 # Request Models
 class PostQueryRequest(BaseModel):
     """Advanced post query parameters"""
@@ -145,6 +276,11 @@ class PostQueryRequest(BaseModel):
         example=False,
         description="Include Reddit award information (increases response size)"
     )
+    use_cache: bool = Field(
+        False,
+        example=True,
+        description="Opt in to serving identical queries from a short-lived cache (results up to 90s old)"
+    )
     
 class CommentQueryRequest(BaseModel):
     """Advanced comment query parameters"""
@@ -233,6 +369,11 @@ class CommentQueryRequest(BaseModel):
         example=200,
         description="Maximum number of comments to return (1-1000)"
     )
+    use_cache: bool = Field(
+        False,
+        example=True,
+        description="Opt in to serving identical queries from a short-lived cache (results up to 90s old)"
+    )
     
 class UserQueryRequest(BaseModel):
     """Advanced user query parameters"""
@@ -259,6 +400,7 @@ class UserQueryRequest(BaseModel):
     exclude_suspended: bool = Field(True, description="Exclude suspended accounts")
     
     limit: int = Field(50, description="Maximum results (1-500)")
+    use_cache: bool = Field(False, description="Opt in to serving identical queries from a short-lived cache (results up to 90s old)")
 
 # Response Models
 class QueryResponse(BaseModel):
@@ -271,162 +413,310 @@ class QueryResponse(BaseModel):
     reddit_api_calls: int
     filters_applied: List[str]
 
-# POST Endpoints for complex queries
-@router.post("/posts", response_model=QueryResponse)
-@require_feature('query_api')
-async def query_posts(
-    request: PostQueryRequest,
-    current_user: User = Depends(require_api_call_limit)
-):
+# Endpoints serialize their payloads straight to ORJSONResponse, so routes
+# document the schema without re-validating every result dict on the way out
+QUERY_RESPONSES = {200: {"model": QueryResponse}}
+
+# Filter checks as source lines, cheapest-first so rejected items exit early.
+# Each runs only when its parameter is set; checks see the item as `item`
+# and its author, bound first, as `author`.
+_POST_FILTER_CHECKS = {
+    'exclude_deleted': "if not author: return False",
+    'exclude_authors': "if author in exclude_authors: return False",
+    'exclude_nsfw': "if item.get('is_nsfw', False): return False",
+    'exclude_spoilers': "if item.get('is_spoiler', False): return False",
+    'exclude_stickied': "if item.get('is_stickied', False): return False",
+    'min_score': "if item.get('score', 0) < min_score: return False",
+    'max_score': "if item.get('score', 0) > max_score: return False",
+    'min_upvote_ratio': "if item.get('upvote_ratio', 0) < min_upvote_ratio: return False",
+    'max_upvote_ratio': "if item.get('upvote_ratio', 1) > max_upvote_ratio: return False",
+    'min_comments': "if item.get('num_comments', 0) < min_comments: return False",
+    'max_comments': "if item.get('num_comments', 0) > max_comments: return False",
+    'include_authors': "if author not in include_authors: return False",
+    'exclude_pattern': "if exclude_pattern.search(item.get('title', '')) or exclude_pattern.search(item.get('selftext', '')): return False",
+    # Accepted: remove selftext if not requested
+    'strip_selftext': "item.pop('selftext', None)",
+}
+
+_COMMENT_FILTER_CHECKS = {
+    'exclude_deleted': "if not author: return False",
+    'exclude_authors': "if author in exclude_authors: return False",
+    'min_score': "if item.get('score', 0) < min_score: return False",
+    'max_score': "if item.get('score', 0) > max_score: return False",
+    'min_depth': "if item.get('depth', 0) < min_depth: return False",
+    'max_depth': "if item.get('depth', 0) > max_depth: return False",
+    'include_authors': "if author not in include_authors: return False",
+    'keyword_pattern': "if not keyword_pattern.search(item.get('body', '')): return False",
+    'exclude_pattern': "if exclude_pattern.search(item.get('body', '')): return False",
+}
+
+# filters_applied labels for query_posts; they depend only on the request
+POST_FILTER_LABELS = (
+    ("keyword_search", lambda r: bool(r.keywords)),
+    ("score_range", lambda r: r.min_score is not None or r.max_score is not None),
+    ("keyword_exclusion", lambda r: bool(r.exclude_keywords)),
+    ("author_filtering", lambda r: bool(r.include_authors or r.exclude_authors)),
+)
+
+# Compiled filter factories keyed by check table and the set of active checks
+_filter_factories: Dict[Tuple[str, frozenset], Callable[..., Callable[[Dict[str, Any]], bool]]] = {}
+
+def _specialize_filter(kind: str, checks: Dict[str, str], params: Dict[str, Any]) -> Callable[[Dict[str, Any]], bool]:
     """
-    Advanced post query with comprehensive filtering options.
+    Build a keep(item) predicate containing only the checks whose parameter
+    is set, so unused filters cost nothing per item. The generated code
+    depends only on which checks are active and is compiled once per combination.
+    """
+    active = frozenset(name for name, value in params.items() if value is not None and value is not False)
     
-    Supports complex queries like:
-    - Posts from multiple subreddits with keyword filtering
-    - Score and engagement thresholds  
-    - Author inclusion/exclusion
-    - Content type filtering
-    - Date range filtering
+    factory = _filter_factories.get((kind, active))
+    if factory is None:
+        body = "\n".join(
+            f"        {check}" for name, check in checks.items() if name in active
+        )
+        source = (
+            f"def make_keep({', '.join(params)}):\n"
+            f"    def keep(item):\n"
+            f"        author = item.get('author')\n"
+            f"{body}\n"
+            f"        return True\n"
+            f"    return keep\n"
+        )
+        namespace = {}
+        exec(compile(source, f"<{kind}_filter>", "exec"), namespace)
+        factory = _filter_factories[(kind, active)] = namespace['make_keep']
+    
+    return factory(**params)
+
+def _build_post_filter(request: PostQueryRequest) -> Callable[[Dict[str, Any]], bool]:
+    """keep(post) predicate specialized to the filters a post query enables"""
+    return _specialize_filter("post", _POST_FILTER_CHECKS, {
+        'exclude_deleted': request.exclude_deleted,
+        'exclude_authors': set(request.exclude_authors) if request.exclude_authors else None,
+        'exclude_nsfw': request.exclude_nsfw,
+        'exclude_spoilers': request.exclude_spoilers,
+        'exclude_stickied': request.exclude_stickied,
+        'min_score': request.min_score,
+        'max_score': request.max_score,
+        'min_upvote_ratio': request.min_upvote_ratio,
+        'max_upvote_ratio': request.max_upvote_ratio,
+        'min_comments': request.min_comments,
+        'max_comments': request.max_comments,
+        'include_authors': set(request.include_authors) if request.include_authors else None,
+        'exclude_pattern': _compile_keyword_pattern(request.exclude_keywords),
+        # Only needed when selftext had to survive until the keyword check;
+        # otherwise query_posts drops it as each batch arrives
+        'strip_selftext': not request.include_self_text and bool(request.exclude_keywords),
+    })
+
+def _build_comment_filter(request: CommentQueryRequest) -> Callable[[Dict[str, Any]], bool]:
+    """keep(comment) predicate specialized to the filters a comment query enables"""
+    return _specialize_filter("comment", _COMMENT_FILTER_CHECKS, {
+        'exclude_deleted': request.exclude_deleted,
+        'exclude_authors': set(request.exclude_authors) if request.exclude_authors else None,
+        'min_score': request.min_score,
+        'max_score': request.max_score,
+        'min_depth': request.min_depth,
+        'max_depth': request.max_depth,
+        'include_authors': set(request.include_authors) if request.include_authors else None,
+        'keyword_pattern': _compile_keyword_pattern(request.keywords),
+        'exclude_pattern': _compile_keyword_pattern(request.exclude_keywords),
+    })
+
+async def _stream_query_results(query_type: str, request: BaseModel, results, summary: Callable[[], Dict[str, Any]]):
     """
+    Encode a query response as NDJSON incrementally as `results` (an async
+    generator) yields: one line with the query type and parameters, one line
+    per result, then a summary line from summary() once results are exhausted.
+    """
+    parameters = orjson.dumps(request.model_dump(exclude_none=True, exclude_defaults=True))
+    yield b'{"query_type":' + orjson.dumps(query_type) + b',"parameters":' + parameters + b'}\n'
+    
+    async with aclosing(results) as items:
+        async for item in items:
+            yield orjson.dumps(item, option=orjson.OPT_NON_STR_KEYS) + b'\n'
+    
+    yield orjson.dumps(summary()) + b'\n'
+
+async def _run_post_query(request: PostQueryRequest, stream: bool = False) -> Response:
+    """Run a post query, returned as JSON (QueryResponse) or streamed as NDJSON"""
     try:
         start_time = time.time()
         
         # Convert request to parameters
-        filters_applied = []
+        filters_applied = tuple(label for label, applies in POST_FILTER_LABELS if applies(request))
         reddit_calls = 0
-        all_results = []
+        
+        cache_key = _query_cache_key("posts", request)
+        if request.use_cache:
+            cached_results = query_result_cache.get(cache_key)
+            if cached_results is not None:
+                if not stream:
+                    return _cached_query_response("posts", request, cached_results, start_time, filters_applied)
+                
+                async def replay_cached():
+                    for post in cached_results:
+                        yield post
+                
+                return StreamingResponse(
+                    _stream_query_results("posts", request, replay_cached(), lambda: {
+                        "count": len(cached_results),
+                        "execution_time_ms": (time.time() - start_time) * 1000,
+                        "reddit_api_calls": 0,
+                        "filters_applied": filters_applied
+                    }),
+                    media_type="application/x-ndjson"
+                )
         
         # Use user-provided sort and time_filter parameters directly
         effective_sort_type = request.sort_type
         effective_time_filter = request.time_filter
         
-        for subreddit in request.subreddits:
+        # Build search query once if keywords provided
+        search_query = " OR ".join(request.keywords) if request.keywords else None
+        # A single subreddit gets extra head-room for filtering; with several,
+        # the other subreddits make up for most filtered-out posts, and fetching
+        # stops once the limit is reached. A small fixed margin still covers
+        # stickied/deleted posts at the top of each listing.
+        if len(request.subreddits) > 1:
+            fetch_limit = min(request.limit + 25, 1000)
+        else:
+            fetch_limit = min(request.limit * 2, 1000)
+        
+        # Without exclude_keywords nothing reads selftext, so an unwanted body is
+        # dropped on arrival instead of being held through filtering
+        strip_on_ingest = not request.include_self_text and not request.exclude_keywords
+        
+        async def fetch_subreddit(reddit, subreddit: str) -> List[Dict[str, Any]]:
+            nonlocal reddit_calls
             reddit_calls += 1
-            
-            # Build search query if keywords provided
-            if request.keywords:
-                search_query = " OR ".join(request.keywords)
-                async with collector.reddit_client as reddit:
-                    posts = await reddit.search_posts(
-                        query=search_query,
-                        subreddit_name=subreddit,
-                        sort=effective_sort_type,
-                        time_filter=effective_time_filter,
-                        limit=min(request.limit * 2, 1000)  # Get extra for filtering
-                    )
-                filters_applied.append("keyword_search")
+            if search_query:
+                posts = await reddit.search_posts(
+                    query=search_query,
+                    subreddit_name=subreddit,
+                    sort=effective_sort_type,
+                    time_filter=effective_time_filter,
+                    limit=fetch_limit
+                )
             else:
                 # Get posts by sort type
-                async with collector.reddit_client as reddit:
-                    posts = await reddit.get_subreddit_posts(
-                        subreddit_name=subreddit,
-                        sort_type=effective_sort_type,
-                        time_filter=effective_time_filter,
-                        limit=min(request.limit * 2, 1000)
-                    )
-            
-            all_results.extend(posts)
+                posts = await reddit.get_subreddit_posts(
+                    subreddit_name=subreddit,
+                    sort_type=effective_sort_type,
+                    time_filter=effective_time_filter,
+                    limit=fetch_limit
+                )
+            if strip_on_ingest:
+                for post in posts:
+                    post.pop('selftext', None)
+            return posts
         
-        # Apply filters
-        filtered_results = []
+        # Predicate specialized to the filters this request uses
+        keep = _build_post_filter(request)
         
-        for post in all_results:
-            # Date filtering - use improved logic with buffers
-            if request.date_from or request.date_to:
-                # Create date range for filtering (using timezone-aware datetimes)
-                if request.date_from and request.date_to:
-                    # Use the improved date filtering logic
-                    if not ImprovedDateFiltering.should_include_post(post, request.date_from, request.date_to):
-                        continue
-                elif request.date_from:
-                    # Only start date provided - use raw date, let ImprovedDateFiltering handle buffering
-                    if not ImprovedDateFiltering.should_include_post(post, request.date_from, datetime.now(timezone.utc)):
-                        continue
-                elif request.date_to:
-                    # Only end date provided - use raw date, let ImprovedDateFiltering handle buffering
-                    # Use a very early date as the start to allow all posts before end date
-                    very_early_date = datetime(2005, 1, 1, tzinfo=timezone.utc)  # Before Reddit existed
-                    if not ImprovedDateFiltering.should_include_post(post, very_early_date, request.date_to):
-                        continue
-            
-            # Score filtering
-            if request.min_score and post.get('score', 0) < request.min_score:
-                continue
-            if request.max_score and post.get('score', 0) > request.max_score:
-                continue
-                
-            # Upvote ratio filtering
-            if request.min_upvote_ratio and post.get('upvote_ratio', 0) < request.min_upvote_ratio:
-                continue
-            if request.max_upvote_ratio and post.get('upvote_ratio', 1) > request.max_upvote_ratio:
-                continue
-                
-            # Comment count filtering
-            if request.min_comments and post.get('num_comments', 0) < request.min_comments:
-                continue
-            if request.max_comments and post.get('num_comments', 0) > request.max_comments:
-                continue
-                
-            # Author filtering
-            author = post.get('author')
-            if request.include_authors and author not in request.include_authors:
-                continue
-            if request.exclude_authors and author in request.exclude_authors:
-                continue
-            if request.exclude_deleted and not author:
-                continue
-                
-            # Content filtering
-            if request.exclude_nsfw and post.get('is_nsfw', False):
-                continue
-            if request.exclude_spoilers and post.get('is_spoiler', False):
-                continue
-            if request.exclude_stickied and post.get('is_stickied', False):
-                continue
-                
-            # Keyword exclusion
-            if request.exclude_keywords:
-                title_text = (post.get('title', '') + ' ' + post.get('selftext', '')).lower()
-                if any(keyword.lower() in title_text for keyword in request.exclude_keywords):
-                    continue
-                    
-            filtered_results.append(post)
+        # Fetch subreddits concurrently over the shared client session
+        reddit = await collector.reddit_client.connect()
+        fetches = _spawn_bounded(fetch_subreddit(reddit, subreddit) for subreddit in request.subreddits)
+        
+        if not stream:
+            # Buffered, so a failing subreddit surfaces as an error response
+            # instead of a 200 whose JSON body stops partway
+            filtered_posts = await _take_filtered(fetches, keep, request.limit)
+            query_result_cache.set(cache_key, filtered_posts)
             
-            if len(filtered_results) >= request.limit:
-                break
+            return ORJSONResponse({
+                "query_type": "posts",
+                "parameters": request.model_dump(exclude_none=True, exclude_defaults=True),
+                "results": filtered_posts,
+                "count": len(filtered_posts),
+                "execution_time_ms": (time.time() - start_time) * 1000,
+                "reddit_api_calls": reddit_calls,
+                "filters_applied": filters_applied
+            })
         
-        # Track applied filters
-        if request.date_from or request.date_to:
-            filters_applied.append("date_range")
-        if request.min_score or request.max_score:
-            filters_applied.append("score_range")
-        if request.exclude_keywords:
-            filters_applied.append("keyword_exclusion")
-        if request.include_authors or request.exclude_authors:
-            filters_applied.append("author_filtering")
-        if not request.include_self_text:
-            # Remove selftext if not requested
-            for post in filtered_results:
-                post.pop('selftext', None)
+        # Wait for the first subreddit before committing to a 200 so an
+        # outright Reddit failure still surfaces as an error response
+        try:
+            if fetches:
+                await fetches[0]
+        except Exception:
+            _cancel_fetches(fetches)
+            raise
         
-        execution_time = (time.time() - start_time) * 1000
+        # Posts are sent as each batch is filtered; count and timing are only
+        # known once the limit is reached, so they go on the last line
+        kept_posts = []
+        stream_error = None
         
-        return QueryResponse(
-            query_type="posts",
-            parameters=request.dict(),
-            results=filtered_results,
-            count=len(filtered_results),
-            execution_time_ms=execution_time,
-            reddit_api_calls=reddit_calls,
-            filters_applied=filters_applied
+        async def kept_stream():
+            nonlocal stream_error
+            try:
+                async with aclosing(_iter_filtered(fetches, keep, request.limit)) as posts:
+                    async for post in posts:
+                        kept_posts.append(post)
+                        yield post
+            except Exception as e:
+                # Headers are already sent; report the failure on the summary line
+                logger.error("Post query failed while streaming: %s", e, exc_info=True)
+                stream_error = "Post query failed"
+                return
+            query_result_cache.set(cache_key, kept_posts)
+        
+        def summary() -> Dict[str, Any]:
+            fields = {
+                "count": len(kept_posts),
+                "execution_time_ms": (time.time() - start_time) * 1000,
+                "reddit_api_calls": reddit_calls,
+                "filters_applied": filters_applied
+            }
+            if stream_error:
+                fields["error"] = stream_error
+            return fields
+        
+        return StreamingResponse(
+            _stream_query_results("posts", request, kept_stream(), summary),
+            media_type="application/x-ndjson"
         )
         
     except Exception as e:
-        logger.error(f"Post query failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error("Post query failed: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Post query failed")
+
+# POST Endpoints for complex queries
+@router.post("/posts", response_model=None, responses=QUERY_RESPONSES)
+@require_feature('query_api')
+async def query_posts(
+    request: PostQueryRequest,
+    current_user: User = Depends(require_api_call_limit)
+):
+    """
+    Advanced post query with comprehensive filtering options.
+    
+    Supports complex queries like:
+    - Posts from multiple subreddits with keyword filtering
+    - Score and engagement thresholds  
+    - Author inclusion/exclusion
+    - Content type filtering
+    """
+    return await _run_post_query(request)
+
+@router.post("/posts/stream", response_model=None, response_class=StreamingResponse)
+@require_feature('query_api')
+async def query_posts_stream(
+    request: PostQueryRequest,
+    current_user: User = Depends(require_api_call_limit)
+):
+    """
+    Same query as POST /posts, streamed as newline-delimited JSON.
+    
+    The first line carries the query type and parameters, each following line
+    is one post as soon as it passes the filters, and the last line holds
+    count, execution_time_ms, reddit_api_calls and filters_applied.
+    """
+    return await _run_post_query(request, stream=True)
 
 # Form-based POST endpoint (easier to use in Swagger UI)
-@router.post("/posts/form", response_model=QueryResponse)
+@router.post("/posts/form", response_model=None, responses=QUERY_RESPONSES)
 @require_feature('query_api')
 async def query_posts_form(
     subreddits: str = Form(..., description="Comma-separated subreddit names (e.g. python,MachineLearning)", example="python,MachineLearning,datascience"),
@@ -470,7 +760,7 @@ async def query_posts_form(
     )
     return await query_posts(request, current_user)
 
-@router.post("/comments", response_model=QueryResponse)
+@router.post("/comments", response_model=None, responses=QUERY_RESPONSES)
 @require_feature('query_api')
 async def query_comments(
     request: CommentQueryRequest,
@@ -489,97 +779,74 @@ async def query_comments(
         start_time = time.time()
         filters_applied = []
         reddit_calls = 0
-        all_results = []
+        filtered_results = []
+        
+        cache_key = _query_cache_key("comments", request)
+        if request.use_cache:
+            cached_results = query_result_cache.get(cache_key)
+            if cached_results is not None:
+                return _cached_query_response("comments", request, cached_results, start_time, filters_applied)
+        
+        # Predicate specialized to the filters this request uses
+        keep = _build_comment_filter(request)
+        
+        async def fetch_comments(reddit, post_id: str, max_comments: int) -> List[Dict[str, Any]]:
+            nonlocal reddit_calls
+            reddit_calls += 1
+            return await reddit.get_post_comments(
+                submission_id=post_id,
+                max_comments=max_comments
+            )
         
         if request.post_ids:
-            # Get comments from specific posts
-            async with collector.reddit_client as reddit:
-                for post_id in request.post_ids:
-                    reddit_calls += 1
-                    comments = await reddit.get_post_comments(
-                        submission_id=post_id,
-                        max_comments=request.limit
-                    )
-                    all_results.extend(comments)
+            # Get comments from specific posts, stopping once enough are kept
+            reddit = await collector.reddit_client.connect()
+            filtered_results = await _take_filtered(
+                _spawn_bounded(fetch_comments(reddit, post_id, request.limit) for post_id in request.post_ids),
+                keep,
+                request.limit
+            )
                 
         elif request.subreddits:
             # Search comments in subreddits (via recent posts)
-            async with collector.reddit_client as reddit:
-                for subreddit in request.subreddits:
-                    reddit_calls += 1
-                    # Get recent posts to find comments
-                    posts = await reddit.get_subreddit_posts(
-                        subreddit_name=subreddit,
-                        sort_type="new",
-                        limit=20  # Get recent posts to search their comments
-                    )
-                    
-                    for post in posts:
-                        reddit_calls += 1
-                        comments = await reddit.get_post_comments(
-                            submission_id=post['reddit_id'],
-                            max_comments=50
-                        )
-                        all_results.extend(comments)
-        
-        # Apply filters
-        filtered_results = []
-        
-        for comment in all_results:
-            # Score filtering
-            if request.min_score and comment.get('score', 0) < request.min_score:
-                continue
-            if request.max_score and comment.get('score', 0) > request.max_score:
-                continue
-                
-            # Depth filtering
-            if request.min_depth and comment.get('depth', 0) < request.min_depth:
-                continue
-            if request.max_depth and comment.get('depth', 0) > request.max_depth:
-                continue
-                
-            # Author filtering
-            author = comment.get('author')
-            if request.include_authors and author not in request.include_authors:
-                continue
-            if request.exclude_authors and author in request.exclude_authors:
-                continue
-            if request.exclude_deleted and not author:
-                continue
-                
-            # Keyword filtering
-            if request.keywords:
-                comment_text = comment.get('body', '').lower()
-                if not any(keyword.lower() in comment_text for keyword in request.keywords):
-                    continue
-                    
-            if request.exclude_keywords:
-                comment_text = comment.get('body', '').lower()
-                if any(keyword.lower() in comment_text for keyword in request.exclude_keywords):
-                    continue
-                    
-            filtered_results.append(comment)
+            reddit = await collector.reddit_client.connect()
+            # Get recent posts to find comments, all subreddits at once
+            posts_per_subreddit = await _gather_bounded(
+                reddit.get_subreddit_posts(
+                    subreddit_name=subreddit,
+                    sort_type="new",
+                    limit=20  # Get recent posts to search their comments
+                )
+                for subreddit in request.subreddits
+            )
+            reddit_calls += len(request.subreddits)
             
-            if len(filtered_results) >= request.limit:
-                break
+            # Then stream comments for the discovered posts until enough are kept
+            post_ids = list(dict.fromkeys(post['reddit_id'] for post in chain.from_iterable(posts_per_subreddit)))
+            filtered_results = await _take_filtered(
+                _spawn_bounded(fetch_comments(reddit, post_id, 50) for post_id in post_ids),
+                keep,
+                request.limit
+            )
         
+        query_result_cache.set(cache_key, filtered_results)
         execution_time = (time.time() - start_time) * 1000
         
-        return QueryResponse(
-            query_type="comments",
-            parameters=request.dict(),
-            results=filtered_results,
-            count=len(filtered_results),
-            execution_time_ms=execution_time,
-            reddit_api_calls=reddit_calls,
-            filters_applied=filters_applied
-        )
+        return ORJSONResponse({
+            "query_type": "comments",
+            "parameters": request.model_dump(exclude_none=True, exclude_defaults=True),
+            "results": filtered_results,
+            "count": len(filtered_results),
+            "execution_time_ms": execution_time,
+            "reddit_api_calls": reddit_calls,
+            "filters_applied": filters_applied
+        })
         
     except Exception as e:
-        logger.error(f"Comment query failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error("Comment query failed: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Comment query failed")
 
-@router.post("/users", response_model=QueryResponse)
+@router.post("/users", response_model=None, responses=QUERY_RESPONSES)
 @require_feature('query_api')
 async def query_users(
     request: UserQueryRequest,
@@ -600,62 +867,113 @@ async def query_users(
         reddit_calls = 0
         all_results = []
         
+        cache_key = _query_cache_key("users", request)
+        if request.use_cache:
+            cached_results = query_result_cache.get(cache_key)
+            if cached_results is not None:
+                return _cached_query_response("users", request, cached_results, start_time, filters_applied)
+        
+        async def fetch_user(reddit, username: str) -> Optional[Dict[str, Any]]:
+            nonlocal reddit_calls
+            cache_key = username.lower()
+            user_data = user_info_cache.get(cache_key)
+            if user_data is not None:
+                return user_data
+            
+            # Join a lookup for the same user already in flight from another request
+            lookup = user_info_inflight.get(cache_key)
+            if lookup is None:
+                reddit_calls += 1
+                lookup = asyncio.create_task(reddit.get_user_info(username))
+                user_info_inflight[cache_key] = lookup
+                lookup.add_done_callback(partial(_finish_user_lookup, cache_key))
+            try:
+                # Shielded so one cancelled request doesn't cancel the shared lookup
+                return await asyncio.shield(lookup)
+            except Exception:
+                return None  # Skip invalid/suspended users
+        
+        async def fetch_hot_posts(reddit, subreddit: str) -> List[Dict[str, Any]]:
+            nonlocal reddit_calls
+            cache_key = subreddit.lower()
+            posts = hot_posts_cache.get(cache_key)
+            if posts is None:
+                reddit_calls += 1
+                posts = await reddit.get_subreddit_posts(
+                    subreddit_name=subreddit,
+                    sort_type="hot",
+                    limit=100
+                )
+                hot_posts_cache.set(cache_key, posts)
+            return posts
+        
         if request.usernames:
-            # Get specific user profiles
-            async with collector.reddit_client as reddit:
-                for username in request.usernames:
-                    reddit_calls += 1
-                    try:
-                        user_data = await reddit.get_user_info(username)
-                        if user_data:
-                            all_results.append(user_data)
-                    except:
-                        continue  # Skip invalid/suspended users
+            # Get specific user profiles, once per name (usernames are case-insensitive)
+            seen_users = set()
+            usernames = []
+            for username in request.usernames:
+                if username.lower() not in seen_users:
+                    seen_users.add(username.lower())
+                    usernames.append(username)
+            
+            reddit = await collector.reddit_client.connect()
+            users = await _gather_bounded(
+                fetch_user(reddit, username) for username in usernames
+            )
+            all_results.extend(user_data for user_data in users if user_data)
                     
         elif request.subreddits:
             # Find active users in subreddits
             seen_users = set()
-            async with collector.reddit_client as reddit:
-                for subreddit in request.subreddits:
-                    reddit_calls += 1
-                    posts = await reddit.get_subreddit_posts(
-                        subreddit_name=subreddit,
-                        sort_type="hot",
-                        limit=100
-                    )
-                    
-                    for post in posts:
-                        author = post.get('author')
-                        if author and author not in seen_users:
-                            seen_users.add(author)
-                            reddit_calls += 1
-                            try:
-                                user_data = await reddit.get_user_info(author)
-                                if user_data:
-                                    all_results.append(user_data)
-                            except:
-                                continue
+            authors = []
+            reddit = await collector.reddit_client.connect()
+            posts_per_subreddit = await _gather_bounded(
+                fetch_hot_posts(reddit, subreddit) for subreddit in request.subreddits
+            )
+            
+            for post in chain.from_iterable(posts_per_subreddit):
+                author = post.get('author')
+                if author and author not in seen_users:
+                    seen_users.add(author)
+                    authors.append(author)
+            
+            users = await _gather_bounded(
+                fetch_user(reddit, author) for author in authors
+            )
+            all_results.extend(user_data for user_data in users if user_data)
         
         # Apply filters
         filtered_results = []
         
+        # Account age bounds as creation-time cutoffs, against a single "now" for
+        # the whole request. An account is max_age days old until it turns max_age + 1.
+        now_utc = datetime.now(timezone.utc)
+        created_before = None
+        created_after = None
+        if request.min_account_age_days is not None:
+            created_before = now_utc - timedelta(days=request.min_account_age_days)
+        if request.max_account_age_days is not None:
+            created_after = now_utc - timedelta(days=request.max_account_age_days + 1)
+        check_age = created_before is not None or created_after is not None
+        
         for user in all_results:
             # Karma filtering
-            if request.min_comment_karma and user.get('comment_karma', 0) < request.min_comment_karma:
+            if request.min_comment_karma is not None and user.get('comment_karma', 0) < request.min_comment_karma:
                 continue
-            if request.min_link_karma and user.get('link_karma', 0) < request.min_link_karma:
+            if request.min_link_karma is not None and user.get('link_karma', 0) < request.min_link_karma:
                 continue
-            if request.min_total_karma and user.get('total_karma', 0) < request.min_total_karma:
+            if request.min_total_karma is not None and user.get('total_karma', 0) < request.min_total_karma:
                 continue
                 
             # Account age filtering
-            if request.min_account_age_days or request.max_account_age_days:
+            if check_age:
                 created = user.get('account_created')
                 if created:
-                    age_days = (datetime.utcnow() - created).days
-                    if request.min_account_age_days and age_days < request.min_account_age_days:
+                    # astimezone() treats naive values as local time, matching fromtimestamp()
+                    created = created.astimezone(timezone.utc)
+                    if created_before is not None and created > created_before:
                         continue
-                    if request.max_account_age_days and age_days > request.max_account_age_days:
+                    if created_after is not None and created <= created_after:
                         continue
             
             filtered_results.append(user)
@@ -663,24 +981,25 @@ async def query_users(
             if len(filtered_results) >= request.limit:
                 break
         
+        query_result_cache.set(cache_key, filtered_results)
         execution_time = (time.time() - start_time) * 1000
         
-        return QueryResponse(
-            query_type="users",
-            parameters=request.dict(),
-            results=filtered_results,
-            count=len(filtered_results),
-            execution_time_ms=execution_time,
-            reddit_api_calls=reddit_calls,
-            filters_applied=filters_applied
-        )
+        return ORJSONResponse({
+            "query_type": "users",
+            "parameters": request.model_dump(exclude_none=True, exclude_defaults=True),
+            "results": filtered_results,
+            "count": len(filtered_results),
+            "execution_time_ms": execution_time,
+            "reddit_api_calls": reddit_calls,
+            "filters_applied": filters_applied
+        })
         
     except Exception as e:
-        logger.error(f"User query failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error("User query failed: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail="User query failed")
 
 # GET endpoints for simple queries
-@router.get("/posts/simple", response_model=QueryResponse)
+@router.get("/posts/simple", response_model=None, responses=QUERY_RESPONSES)
 @require_feature('query_api')
 async def simple_post_query(
     subreddits: str = FastAPIQuery(..., description="Comma-separated subreddit names"),
@@ -1,17 +1,78 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple
 from datetime import datetime, date, timedelta
+from functools import partial
 from pydantic import BaseModel
+import asyncio
+import hashlib
+import orjson
+import time
 
 from models.database import get_db
 from models.models import User
 from services.data_collector import DataCollector
+from services.cache import TTLCache
 from api.auth import require_api_call_limit
 
-router = APIRouter(prefix="/api/scenarios", tags=["scenarios"])
+router = APIRouter(prefix="/api/scenarios", tags=["scenarios"], default_response_class=ORJSONResponse)
 collector = DataCollector()
 
+# r/all listings are the same for every user; keyed by (sort_type, time_filter, limit)
+top_posts_all_cache = TTLCache(maxsize=64, ttl_seconds=300)
+
+# Collector calls currently running, keyed by method name and arguments
+scenario_inflight: Dict[Tuple, asyncio.Task] = {}
+
+
+def _parse_csv(value: str) -> List[str]:
+    """Split a comma-separated query parameter, dropping blank entries"""
+    return [item for item in (part.strip() for part in value.split(',')) if item]
+
+
+def _finish_scenario_call(key: Tuple, call: asyncio.Task) -> None:
+    """Drop a completed collector call from the in-flight table"""
+    if scenario_inflight.get(key) is call:
+        del scenario_inflight[key]
+    if not call.cancelled():
+        call.exception()  # Waiters re-raise it; marks it retrieved if they all left
+
+
+async def _coalesced(fetch: Callable[..., Awaitable[Any]], **kwargs) -> Any:
+    """
+    Run a collector call once for identical concurrent requests; later callers
+    await the same task instead of repeating the Reddit fetches.
+    """
+    key = (fetch.__name__,) + tuple(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in sorted(kwargs.items())
+    )
+    call = scenario_inflight.get(key)
+    if call is None:
+        call = asyncio.ensure_future(fetch(**kwargs))
+        scenario_inflight[key] = call
+        call.add_done_callback(partial(_finish_scenario_call, key))
+    # Shielded so one cancelled request doesn't cancel the shared call
+    return await asyncio.shield(call)
+
+
+def _body_hash(body: bytes) -> str:
+    """Short content hash used as an ETag value"""
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Weak If-None-Match comparison, so clients can revalidate with a 304"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
 # Request/Response Models
 class ScenarioResponse(BaseModel):
     scenario: str
@@ -28,7 +89,7 @@ async def scenario_1_subreddit_keyword_search(
     date_from: date = Query(..., description="Start date (YYYY-MM-DD)"),
     date_to: date = Query(..., description="End date (YYYY-MM-DD)"),
     limit: int = Query(10, description="Number of results to return"),
-    sort_by: str = Query("score", description="Sort by: score, comments, date"),
+    sort_by: Literal["score", "comments", "date"] = Query("score", description="Sort by: score, comments, date"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_api_call_limit)
 ):
@@ -38,14 +99,15 @@ async def scenario_1_subreddit_keyword_search(
     Example: GET /api/scenarios/1/subreddit-keyword-search?subreddit=python&keywords=poetry,package&date_from=2024-01-01&date_to=2024-12-31&limit=10&sort_by=score
     """
     try:
-        import time
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
-        keyword_list = [k.strip() for k in keywords.split(',')]
+        keyword_list = _parse_csv(keywords)
+        # Half-open range [date_from, date_to + 1 day) covers date_to in full
         date_from_dt = datetime.combine(date_from, datetime.min.time())
-        date_to_dt = datetime.combine(date_to, datetime.max.time())
+        date_to_dt = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
         
-        results = await collector.search_subreddit_posts_by_keyword_and_date(
+        results = await _coalesced(
+            collector.search_subreddit_posts_by_keyword_and_date,
             subreddit=subreddit,
             keywords=keyword_list,
             date_from=date_from_dt,
@@ -54,7 +116,7 @@ async def scenario_1_subreddit_keyword_search(
             sort_by=sort_by
         )
         
-        execution_time = (time.time() - start_time) * 1000
+        execution_time = (time.perf_counter_ns() - start_ns) / 1_000_000
         
         return ScenarioResponse(
             scenario="1",
@@ -71,7 +133,7 @@ async def scenario_1_subreddit_keyword_search(
 @router.get("/2/trending-multi-subreddits", response_model=ScenarioResponse)
 async def scenario_2_trending_multi_subreddits(
     subreddits: str = Query(..., description="Comma-separated subreddit names (e.g., 'claudecode,vibecoding,aiagent')"),
-    timeframe: str = Query("day", description="Timeframe: hour, day, week"),
+    timeframe: Literal["hour", "day", "week"] = Query("day", description="Timeframe: hour, day, week"),
     limit: int = Query(10, description="Number of trending posts to return"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_api_call_limit)
@@ -82,19 +144,19 @@ async def scenario_2_trending_multi_subreddits(
     Example: GET /api/scenarios/2/trending-multi-subreddits?subreddits=claudecode,vibecoding,aiagent&timeframe=day&limit=10
     """
     try:
-        import time
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
-        subreddit_list = [s.strip() for s in subreddits.split(',')]
+        subreddit_list = _parse_csv(subreddits)
         
-        results = await collector.get_trending_posts_multiple_subreddits(
+        results = await _coalesced(
+            collector.get_trending_posts_multiple_subreddits,
             subreddits=subreddit_list,
             timeframe=timeframe,
             limit_per_subreddit=20,
             final_limit=limit
         )
         
-        execution_time = (time.time() - start_time) * 1000
+        execution_time = (time.perf_counter_ns() - start_ns) / 1_000_000
         
         return ScenarioResponse(
             scenario="2",
@@ -110,8 +172,10 @@ async def scenario_2_trending_multi_subreddits(
 # SCENARIO 3: Top posts in r/all
 @router.get("/3/top-posts-all", response_model=ScenarioResponse)
 async def scenario_3_top_posts_all(
-    sort_type: str = Query("hot", description="Sort type: hot, top, new, rising, controversial"),
-    time_filter: str = Query("week", description="Time filter: hour, day, week, month, year, all"),
+    request: Request,
+    response: Response,
+    sort_type: Literal["hot", "top", "new", "rising", "controversial"] = Query("hot", description="Sort type: hot, top, new, rising, controversial"),
+    time_filter: Literal["hour", "day", "week", "month", "year", "all"] = Query("week", description="Time filter: hour, day, week, month, year, all"),
     limit: int = Query(10, description="Number of posts to return"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_api_call_limit)
@@ -122,16 +186,28 @@ async def scenario_3_top_posts_all(
     Example: GET /api/scenarios/3/top-posts-all?sort_type=hot&time_filter=week&limit=10
     """
     try:
-        import time
-        start_time = time.time()
-        
-        results = await collector.get_top_posts_all_reddit(
-            sort_type=sort_type,
-            time_filter=time_filter,
-            limit=limit
-        )
-        
-        execution_time = (time.time() - start_time) * 1000
+        start_ns = time.perf_counter_ns()
+        
+        cache_key = (sort_type, time_filter, limit)
+        cached = top_posts_all_cache.get(cache_key)
+        if cached is None:
+            results = await _coalesced(
+                collector.get_top_posts_all_reddit,
+                sort_type=sort_type,
+                time_filter=time_filter,
+                limit=limit
+            )
+            # Weak tag: execution_time_ms differs between otherwise identical bodies
+            cached = (results, f'W/"{_body_hash(orjson.dumps(results))}"')
+            top_posts_all_cache.set(cache_key, cached)
+        results, etag = cached
+        
+        cache_headers = {"ETag": etag, "Cache-Control": "private, max-age=60"}
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=cache_headers)
+        response.headers.update(cache_headers)
+        
+        execution_time = (time.perf_counter_ns() - start_ns) / 1_000_000
         
         return ScenarioResponse(
             scenario="3",
@@ -148,7 +224,7 @@ async def scenario_3_top_posts_all(
 @router.get("/4/most-popular-today", response_model=ScenarioResponse)
 async def scenario_4_most_popular_today(
     subreddit: str = Query(..., description="Subreddit name (e.g., 'openai')"),
-    metric: str = Query("score", description="Popularity metric: score, comments, upvote_ratio"),
+    metric: Literal["score", "comments", "upvote_ratio"] = Query("score", description="Popularity metric: score, comments, upvote_ratio"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_api_call_limit)
 ):
@@ -158,15 +234,15 @@ async def scenario_4_most_popular_today(
     Example: GET /api/scenarios/4/most-popular-today?subreddit=openai&metric=score
     """
     try:
-        import time
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
-        result = await collector.get_most_popular_post_today(
+        result = await _coalesced(
+            collector.get_most_popular_post_today,
             subreddit=subreddit,
             metric=metric
         )
         
-        execution_time = (time.time() - start_time) * 1000
+        execution_time = (time.perf_counter_ns() - start_ns) / 1_000_000
         
         results = [result] if result else []
         
@@ -189,7 +265,7 @@ async def get_top_comments_by_criteria(
     keywords: Optional[str] = Query(None, description="Comma-separated keywords to search for"),
     days_back: int = Query(7, description="Days to look back"),
     limit: int = Query(10, description="Number of comments to return"),
-    sort_by: str = Query("score", description="Sort by: score, date, length"),
+    sort_by: Literal["score", "date", "length"] = Query("score", description="Sort by: score, date, length"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_api_call_limit)
 ):
@@ -201,14 +277,13 @@ async def get_top_comments_by_criteria(
     - Top comments on specific post: GET /comments/top-by-criteria?post_id=abc123&limit=10
     """
     try:
-        import time
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         # Calculate date range
         date_to = datetime.utcnow()
         date_from = date_to - timedelta(days=days_back)
         
-        keyword_list = [k.strip() for k in keywords.split(',')] if keywords else None
+        keyword_list = _parse_csv(keywords) if keywords else None
         
         results = await collector.get_top_comments_by_criteria(
             subreddit=subreddit,
@@ -220,7 +295,7 @@ async def get_top_comments_by_criteria(
             sort_by=sort_by
         )
         
-        execution_time = (time.time() - start_time) * 1000
+        execution_time = (time.perf_counter_ns() - start_ns) / 1_000_000
         
         description_parts = []
         if subreddit:
@@ -249,7 +324,7 @@ async def get_top_users_by_activity(
     subreddits: Optional[str] = Query(None, description="Comma-separated subreddit names to analyze"),
     days_back: int = Query(7, description="Days to analyze"),
     limit: int = Query(10, description="Number of users to return"),
-    metric: str = Query("total_score", description="Ranking metric: total_score, post_count, comment_count"),
+    metric: Literal["total_score", "post_count", "comment_count"] = Query("total_score", description="Ranking metric: total_score, post_count, comment_count"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_api_call_limit)
 ):
@@ -261,19 +336,19 @@ async def get_top_users_by_activity(
     - Highest scoring users across multiple subs: GET /users/top-by-activity?subreddits=python,javascript,golang&metric=total_score
     """
     try:
-        import time
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
-        subreddit_list = [s.strip() for s in subreddits.split(',')] if subreddits else None
+        subreddit_list = _parse_csv(subreddits) if subreddits else None
         
-        results = await collector.get_top_users_by_activity(
+        results = await _coalesced(
+            collector.get_top_users_by_activity,
             subreddits=subreddit_list,
             timeframe_days=days_back,
             limit=limit,
             metric=metric
         )
         
-        execution_time = (time.time() - start_time) * 1000
+        execution_time = (time.perf_counter_ns() - start_ns) / 1_000_000
         
         subreddit_desc = f"in {subreddit_list}" if subreddit_list else "across Reddit"
         
@@ -289,54 +364,68 @@ async def get_top_users_by_activity(
         raise HTTPException(status_code=500, detail=str(e))
 
 # COMBINED SCENARIOS ENDPOINT
+SCENARIO_EXAMPLES = {
+    "scenario_1": {
+        "description": "10 most popular posts in r/python about 'poetry' from date X to Y",
+        "endpoint": "/api/scenarios/1/subreddit-keyword-search",
+        "example_url": "/api/scenarios/1/subreddit-keyword-search?subreddit=python&keywords=poetry,package&date_from=2024-01-01&date_to=2024-12-31&limit=10&sort_by=score"
+    },
+    "scenario_2": {
+        "description": "Trending posts in r/claudecode, r/vibecoding, r/aiagent for today",
+        "endpoint": "/api/scenarios/2/trending-multi-subreddits", 
+        "example_url": "/api/scenarios/2/trending-multi-subreddits?subreddits=claudecode,vibecoding,aiagent&timeframe=day&limit=10"
+    },
+    "scenario_3": {
+        "description": "Top 10 hot posts in r/all for this week",
+        "endpoint": "/api/scenarios/3/top-posts-all",
+        "example_url": "/api/scenarios/3/top-posts-all?sort_type=hot&time_filter=week&limit=10"
+    },
+    "scenario_4": {
+        "description": "Most popular post in r/openai today",
+        "endpoint": "/api/scenarios/4/most-popular-today",
+        "example_url": "/api/scenarios/4/most-popular-today?subreddit=openai&metric=score"
+    },
+    "comments": {
+        "description": "Top comments with various filters",
+        "endpoint": "/api/scenarios/comments/top-by-criteria",
+        "examples": [
+            "/api/scenarios/comments/top-by-criteria?subreddit=python&keywords=django&limit=10",
+            "/api/scenarios/comments/top-by-criteria?post_id=abc123&limit=10"
+        ]
+    },
+    "users": {
+        "description": "Most active users by various metrics",
+        "endpoint": "/api/scenarios/users/top-by-activity",
+        "examples": [
+            "/api/scenarios/users/top-by-activity?subreddits=python&metric=post_count&limit=10",
+            "/api/scenarios/users/top-by-activity?subreddits=python,javascript,golang&metric=total_score"
+        ]
+    }
+}
+
+# Static payload, serialized once at import instead of on every request
+SCENARIO_EXAMPLES_BODY = orjson.dumps({
+    "description": "Trendit API Scenarios - Comprehensive Reddit Data Collection Examples",
+    "scenarios": SCENARIO_EXAMPLES,
+    "base_url": "http://localhost:8000"
+})
+SCENARIO_EXAMPLES_HEADERS = {
+    "ETag": f'"{_body_hash(SCENARIO_EXAMPLES_BODY)}"',
+    "Cache-Control": "private, max-age=86400"
+}
+
 @router.get("/examples", response_model=dict)
 async def get_scenario_examples(
+    request: Request,
     current_user: User = Depends(require_api_call_limit)
 ):
     """
     Get example API calls for all scenarios
     """
-    examples = {
-        "scenario_1": {
-            "description": "10 most popular posts in r/python about 'poetry' from date X to Y",
-            "endpoint": "/api/scenarios/1/subreddit-keyword-search",
-            "example_url": "/api/scenarios/1/subreddit-keyword-search?subreddit=python&keywords=poetry,package&date_from=2024-01-01&date_to=2024-12-31&limit=10&sort_by=score"
-        },
-        "scenario_2": {
-            "description": "Trending posts in r/claudecode, r/vibecoding, r/aiagent for today",
-            "endpoint": "/api/scenarios/2/trending-multi-subreddits", 
-            "example_url": "/api/scenarios/2/trending-multi-subreddits?subreddits=claudecode,vibecoding,aiagent&timeframe=day&limit=10"
-        },
-        "scenario_3": {
-            "description": "Top 10 hot posts in r/all for this week",
-            "endpoint": "/api/scenarios/3/top-posts-all",
-            "example_url": "/api/scenarios/3/top-posts-all?sort_type=hot&time_filter=week&limit=10"
-        },
-        "scenario_4": {
-            "description": "Most popular post in r/openai today",
-            "endpoint": "/api/scenarios/4/most-popular-today",
-            "example_url": "/api/scenarios/4/most-popular-today?subreddit=openai&metric=score"
-        },
-        "comments": {
-            "description": "Top comments with various filters",
-            "endpoint": "/api/scenarios/comments/top-by-criteria",
-            "examples": [
-                "/api/scenarios/comments/top-by-criteria?subreddit=python&keywords=django&limit=10",
-                "/api/scenarios/comments/top-by-criteria?post_id=abc123&limit=10"
-            ]
-        },
-        "users": {
-            "description": "Most active users by various metrics",
-            "endpoint": "/api/scenarios/users/top-by-activity",
-            "examples": [
-                "/api/scenarios/users/top-by-activity?subreddits=python&metric=post_count&limit=10",
-                "/api/scenarios/users/top-by-activity?subreddits=python,javascript,golang&metric=total_score"
-            ]
-        }
-    }
-    
-    return {
-        "description": "Trendit API Scenarios - Comprehensive Reddit Data Collection Examples",
-        "scenarios": examples,
-        "base_url": "http://localhost:8000"
-    }
\ No newline at end of file
+    if _etag_matches(request, SCENARIO_EXAMPLES_HEADERS["ETag"]):
+        return Response(status_code=304, headers=SCENARIO_EXAMPLES_HEADERS)
+    return Response(
+        content=SCENARIO_EXAMPLES_BODY,
+        media_type="application/json",
+        headers=SCENARIO_EXAMPLES_HEADERS
+    )
\ No newline at end of file
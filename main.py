@@ -11,8 +11,8 @@ from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
 from sentry_sdk.integrations.logging import LoggingIntegration
 
 from models.database import engine, Base
-from api.scenarios import router as scenarios_router
-from api.query import router as query_router
+from api.scenarios import router as scenarios_router, collector as scenarios_collector
+from api.query import router as query_router, collector as query_collector
 from api.collect import router as collect_router
 from api.data import router as data_router
 from api.export import router as export_router
@@ -21,12 +21,20 @@ from api.auth import router as auth_router
 from api.auth0_auth import router as auth0_router
 from api.billing import router as billing_router
 from api.webhooks import router as webhooks_router
+from services.paddle_service import paddle_service
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Sentry event levels that are kept as breadcrumbs only
+SENTRY_DROPPED_LEVELS = frozenset({"info"})
+
+def _sentry_before_send(event, _hint):
+    """Drop info-level events before they are sent to Sentry"""
+    return None if event.get("level") in SENTRY_DROPPED_LEVELS else event
+
 # Initialize Sentry for error monitoring
 sentry_dsn = os.getenv("SENTRY_DSN")
 if sentry_dsn:
@@ -47,7 +55,7 @@ if sentry_dsn:
         profiles_sample_rate=1.0 if debug else 0.1,
         auto_enabling_integrations=debug,
         environment=os.getenv("ENVIRONMENT", "development"),
-        before_send=lambda event, _hint: event if event.get('level') != 'info' else None,
+        before_send=_sentry_before_send,
     )
 
 # Configure logging
@@ -67,15 +75,27 @@ async def lifespan(app: FastAPI):
         # Log the database URL
         from models.database import DATABASE_URL
         logger.info(f"Connecting to database: {DATABASE_URL}")
+        logger.info(f"Database pool: {engine.pool.status()}")
         
-        # Create database tables
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created/verified")
+        # Schema is managed by init_db.py and migrations/; creating tables on
+        # boot costs a catalog query per table on every cold start, so it is
+        # opt-in for local development
+        if os.getenv("DB_AUTO_CREATE", "false").lower() == "true":
+            Base.metadata.create_all(bind=engine)
+            logger.info("Database tables created/verified")
         
         # Initialize rate limiter
         from services.rate_limiter import rate_limiter
         logger.info("Rate limiter initialized (Redis or in-memory fallback)")
         
+        # Open long-lived Reddit sessions shared across requests
+        for collector in (query_collector, scenarios_collector):
+            await collector.reddit_client.connect()
+        logger.info("Reddit client sessions opened")
+        
+        # Keep-alive pool for outbound Paddle API calls
+        await paddle_service.connect()
+        
     except Exception as e:
         logger.error(f"Error during startup: {e}")
         # You might want to raise the exception to prevent the app from starting
@@ -85,6 +105,9 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Trendit API server...")
+    for collector in (query_collector, scenarios_collector):
+        await collector.reddit_client.close()
+    await paddle_service.close()
 
 # Create FastAPI application
 app = FastAPI(
@@ -127,9 +150,11 @@ if os.getenv("ADDITIONAL_CORS_ORIGINS"):
 if os.getenv("DEBUG", "false").lower() == "true":
     allowed_origins = ["*"]
 
+# Starlette checks each request's Origin with `in`, so hand it a frozenset
+# for constant-time lookups instead of scanning the list
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=allowed_origins,
+    allow_origins=frozenset(allowed_origins),
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Database migration: Add covering indexes for export queries
+
+Adds:
+- idx_reddit_posts_export: (subreddit, created_utc DESC, score) INCLUDE (id, title, author, num_comments)
+- idx_reddit_posts_job_created: (collection_job_id, created_utc DESC)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from models.database import engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+def migrate_export_indexes():
+    """Create export indexes on reddit_posts without locking writes"""
+    
+    migrations = [
+        # Covering index for subreddit/date/score export filters (index-only scans)
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reddit_posts_export
+           ON reddit_posts (subreddit, created_utc DESC, score)
+           INCLUDE (id, title, author, num_comments);""",
+        
+        # Job-scoped exports ordered by creation time
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reddit_posts_job_created
+           ON reddit_posts (collection_job_id, created_utc DESC);""",
+    ]
+    
+    try:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            for migration in migrations:
+                logger.info(f"Executing: {migration}")
+                connection.execute(text(migration))
+        
+        print("✅ Export index migration completed successfully!")
+        print("Added indexes:")
+        print("  - idx_reddit_posts_export (covering)")
+        print("  - idx_reddit_posts_job_created")
+        
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        print(f"❌ Migration failed: {e}")
+        return False
+    
+    return True
+
+def verify_migration():
+    """Verify the migration was successful"""
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(text("""
+                SELECT indexname, indexdef 
+                FROM pg_indexes 
+                WHERE tablename = 'reddit_posts' 
+                AND indexname IN ('idx_reddit_posts_export', 'idx_reddit_posts_job_created');
+            """))
+            
+            indexes = result.fetchall()
+            print("\n🔍 Export indexes:")
+            for idx in indexes:
+                print(f"  - {idx[0]}: {idx[1]}")
+                
+    except Exception as e:
+        print(f"❌ Verification failed: {e}")
+
+if __name__ == "__main__":
+    print("🔄 Running export index migration...")
+    
+    if migrate_export_indexes():
+        print("\n🔍 Verifying migration...")
+        verify_migration()
+    else:
+        sys.exit(1)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Database migration: Store Paddle webhook payloads as JSONB
+
+Changes:
+- billing_events.raw_event_data: TEXT -> JSONB (existing rows are cast in place)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from models.database import engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+def migrate_billing_event_payload():
+    """Convert billing_events.raw_event_data to JSONB"""
+    
+    migrations = [
+        # Existing rows hold json.dumps() output, so a direct cast is safe
+        """ALTER TABLE billing_events
+           ALTER COLUMN raw_event_data TYPE JSONB
+           USING raw_event_data::jsonb;""",
+    ]
+    
+    try:
+        with engine.connect() as connection:
+            for migration in migrations:
+                logger.info(f"Executing: {migration}")
+                connection.execute(text(migration))
+                connection.commit()
+        
+        print("✅ Billing event payload migration completed successfully!")
+        print("Changed columns:")
+        print("  - billing_events.raw_event_data (TEXT -> JSONB)")
+    
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        print(f"❌ Migration failed: {e}")
+        return False
+    
+    return True
+
+def verify_migration():
+    """Verify the migration was successful"""
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(text("""
+                SELECT column_name, data_type
+                FROM information_schema.columns
+                WHERE table_name = 'billing_events'
+                AND column_name = 'raw_event_data';
+            """))
+            
+            columns = result.fetchall()
+            print("\n🔍 billing_events columns:")
+            for col in columns:
+                print(f"  - {col[0]}: {col[1]}")
+    
+    except Exception as e:
+        print(f"❌ Verification failed: {e}")
+
+if __name__ == "__main__":
+    print("🔄 Running billing event payload migration...")
+    
+    if migrate_billing_event_payload():
+        print("\n🔍 Verifying migration...")
+        verify_migration()
+    else:
+        sys.exit(1)
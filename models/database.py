@@ -2,6 +2,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,11 +11,29 @@ load_dotenv()
 # NOTE: SQLite is for development and testing only - use PostgreSQL for production
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./trendit.db")
 
+def _json_serializer(value) -> str:
+    """Serialize JSON/JSONB column values with orjson instead of stdlib json"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
 # SQLite requires check_same_thread=False for FastAPI
 if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        json_serializer=_json_serializer
+    )
 else:
-    engine = create_engine(DATABASE_URL)
+    # Bounded pool so bursts (e.g. webhook storms) queue for a connection
+    # instead of opening more; pre-ping/recycle drop connections the server
+    # or a proxy has closed
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_pre_ping=True,
+        pool_recycle=300,
+        json_serializer=_json_serializer
+    )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, Text, ForeignKey, Index, JSON, Enum
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -255,6 +256,13 @@ class Analytics(Base):
 Index('idx_reddit_posts_subreddit_score', RedditPost.subreddit, RedditPost.score)
 Index('idx_reddit_posts_created_utc', RedditPost.created_utc)
 Index('idx_reddit_posts_collection_job', RedditPost.collection_job_id)
+# Covering indexes for export filters (subreddit/date/score and job/date)
+Index(
+    'idx_reddit_posts_export',
+    RedditPost.subreddit, RedditPost.created_utc.desc(), RedditPost.score,
+    postgresql_include=['id', 'title', 'author', 'num_comments']
+)
+Index('idx_reddit_posts_job_created', RedditPost.collection_job_id, RedditPost.created_utc.desc())
 Index('idx_reddit_comments_post_id', RedditComment.post_id)
 Index('idx_reddit_comments_score', RedditComment.score)
 Index('idx_reddit_comments_created_utc', RedditComment.created_utc)
@@ -370,7 +378,7 @@ class BillingEvent(Base):
     status = Column(String, nullable=False, index=True)  # "success", "failed", "pending"
     
     # Raw Event Data (for debugging and audit)
-    raw_event_data = Column(Text, nullable=False)  # Full JSON dump of Paddle event
+    raw_event_data = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)  # Full Paddle event payload
     
     # Timing
     paddle_event_time = Column(DateTime(timezone=True), nullable=False, index=True)
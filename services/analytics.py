@@ -3,7 +3,8 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from collections import Counter
 import json
-from sqlalchemy.orm import Session
+from sqlalchemy import Float, Row, cast, func
+from sqlalchemy.orm import Session, load_only, selectinload
 from models.models import CollectionJob, RedditPost, RedditComment, Analytics
 
 logger = logging.getLogger(__name__)
@@ -38,16 +39,37 @@ class AnalyticsService:
                 raise ValueError(f"Collection job {job_id} not found")
             
             # Get all posts and comments for this job
-            posts = db.query(RedditPost).filter(RedditPost.collection_job_id == job.id).all()
-            comments = []
-            for post in posts:
-                post_comments = db.query(RedditComment).filter(RedditComment.post_id == post.id).all()
-                comments.extend(post_comments)
+            # Comments are eager-loaded in batched IN queries rather than per post;
+            # only the columns the analyses below read are fetched
+            posts = (
+                db.query(RedditPost)
+                .options(
+                    load_only(
+                        RedditPost.title,
+                        RedditPost.selftext,
+                        RedditPost.url,
+                        RedditPost.subreddit,
+                        RedditPost.author,
+                        RedditPost.score,
+                        RedditPost.is_nsfw,
+                        RedditPost.post_hint,
+                        RedditPost.created_utc
+                    ),
+                    selectinload(RedditPost.comments).load_only(
+                        RedditComment.author,
+                        RedditComment.score
+                    )
+                )
+                .filter(RedditPost.collection_job_id == job.id)
+                .all()
+            )
+            comments = [comment for post in posts for comment in post.comments]
+            summary = self._sql_summary(job.id, db)
             
             # Generate analytics
             analytics_data = {
-                "summary": self._generate_summary_stats(posts, comments),
-                "engagement": self._analyze_engagement(posts, comments),
+                "summary": self._generate_summary_stats(summary, comments),
+                "engagement": self._analyze_engagement(job.id, db, summary),
                 "content": self._analyze_content(posts, comments),
                 "temporal": self._analyze_temporal_patterns(posts, comments),
                 "users": self._analyze_user_activity(posts, comments),
@@ -57,12 +79,12 @@ class AnalyticsService:
             # Save analytics to database
             analytics_record = Analytics(
                 collection_job_id=job.id,
-                total_posts=len(posts),
+                total_posts=summary.total_posts,
                 total_comments=len(comments),
-                total_users=len(set([p.author for p in posts if p.author] + [c.author for c in comments if c.author])),
-                avg_score=sum([p.score for p in posts]) / len(posts) if posts else 0,
-                avg_comments_per_post=sum([p.num_comments for p in posts]) / len(posts) if posts else 0,
-                avg_upvote_ratio=sum([p.upvote_ratio for p in posts]) / len(posts) if posts else 0,
+                total_users=analytics_data["users"]["total_unique_users"],
+                avg_score=summary.avg_score or 0,
+                avg_comments_per_post=summary.avg_comments_per_post or 0,
+                avg_upvote_ratio=summary.avg_upvote_ratio or 0,
                 top_posts=json.dumps(analytics_data["engagement"]["top_posts"]),
                 most_commented=json.dumps(analytics_data["engagement"]["most_commented"]),
                 active_users=json.dumps(analytics_data["users"]["most_active"]),
@@ -82,13 +104,30 @@ class AnalyticsService:
             logger.error(f"Error generating analytics for job {job_id}: {e}")
             raise
     
+    def _sql_summary(
+        self,
+        collection_job_id: int,
+        db: Session
+    ) -> Row:
+        """Aggregate post statistics for a collection job in a single query"""
+        return db.query(
+            func.count(RedditPost.id).label("total_posts"),
+            cast(func.avg(RedditPost.score), Float).label("avg_score"),
+            func.min(RedditPost.score).label("min_score"),
+            func.max(RedditPost.score).label("max_score"),
+            cast(func.avg(RedditPost.num_comments), Float).label("avg_comments_per_post"),
+            cast(func.avg(RedditPost.upvote_ratio), Float).label("avg_upvote_ratio"),
+            func.min(RedditPost.created_utc).label("earliest"),
+            func.max(RedditPost.created_utc).label("latest")
+        ).filter(RedditPost.collection_job_id == collection_job_id).one()
+    
     def _generate_summary_stats(
         self,
-        posts: List[RedditPost],
+        summary: Row,
         comments: List[RedditComment]
     ) -> Dict[str, Any]:
         """Generate summary statistics"""
-        if not posts:
+        if not summary.total_posts:
             return {
                 "total_posts": 0,
                 "total_comments": 0,
@@ -98,33 +137,42 @@ class AnalyticsService:
                 "date_range": {"earliest": None, "latest": None}
             }
         
-        scores = [p.score for p in posts]
-        dates = [p.created_utc for p in posts if p.created_utc]
-        
         return {
-            "total_posts": len(posts),
+            "total_posts": summary.total_posts,
             "total_comments": len(comments),
-            "avg_score": sum(scores) / len(scores),
-            "avg_comments_per_post": sum([p.num_comments for p in posts]) / len(posts),
+            "avg_score": summary.avg_score,
+            "avg_comments_per_post": summary.avg_comments_per_post,
             "score_range": {
-                "min": min(scores),
-                "max": max(scores)
+                "min": summary.min_score,
+                "max": summary.max_score
             },
             "date_range": {
-                "earliest": min(dates).isoformat() if dates else None,
-                "latest": max(dates).isoformat() if dates else None
+                "earliest": summary.earliest.isoformat() if summary.earliest else None,
+                "latest": summary.latest.isoformat() if summary.latest else None
             }
         }
     
     def _analyze_engagement(
         self,
-        posts: List[RedditPost],
-        comments: List[RedditComment]
+        collection_job_id: int,
+        db: Session,
+        summary: Row
     ) -> Dict[str, Any]:
         """Analyze engagement metrics"""
-        # Sort posts by score
-        top_posts = sorted(posts, key=lambda x: x.score, reverse=True)[:10]
-        most_commented = sorted(posts, key=lambda x: x.num_comments, reverse=True)[:10]
+        # Let the database rank posts and return only the top 10 rows
+        top_query = db.query(
+            RedditPost.title,
+            RedditPost.score,
+            RedditPost.num_comments,
+            RedditPost.subreddit,
+            RedditPost.reddit_id
+        ).filter(RedditPost.collection_job_id == collection_job_id)
+        top_posts = top_query.order_by(
+            RedditPost.score.desc().nulls_last(), RedditPost.id
+        ).limit(10).all()
+        most_commented = top_query.order_by(
+            RedditPost.num_comments.desc().nulls_last(), RedditPost.id
+        ).limit(10).all()
         
         # Convert to serializable format
         top_posts_data = [
@@ -152,10 +200,10 @@ class AnalyticsService:
         return {
             "top_posts": top_posts_data,
             "most_commented": most_commented_data,
-            "avg_upvote_ratio": sum([p.upvote_ratio for p in posts]) / len(posts) if posts else 0,
+            "avg_upvote_ratio": summary.avg_upvote_ratio or 0,
             "high_engagement_threshold": {
-                "score": sum([p.score for p in posts]) / len(posts) * 2 if posts else 0,
-                "comments": sum([p.num_comments for p in posts]) / len(posts) * 2 if posts else 0
+                "score": (summary.avg_score or 0) * 2,
+                "comments": (summary.avg_comments_per_post or 0) * 2
             }
         }
     
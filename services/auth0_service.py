@@ -12,7 +12,6 @@ from jose.exceptions import JWTError, JWTClaimsError, ExpiredSignatureError
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from models.models import User, SubscriptionStatus
-from passlib.context import CryptContext
 import logging
 
 logger = logging.getLogger(__name__)
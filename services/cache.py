@@ -0,0 +1,58 @@
+"""
+In-process TTL Cache
+
+Small least-recently-used cache with per-entry expiry, used to memoize
+slow-changing Reddit lookups across requests within a worker process.
+"""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    LRU cache whose entries expire a fixed number of seconds after insertion.
+
+    Thread-safe; expired entries are evicted lazily on access, and the least
+    recently used entry is evicted once maxsize is reached.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 300):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._store: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value for key, or default if missing/expired"""
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._store[key]
+                return default
+
+            self._store.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Cache value under key for ttl_seconds"""
+        with self._lock:
+            self._store[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._store.move_to_end(key)
+
+            while len(self._store) > self.maxsize:
+                self._store.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached entries"""
+        with self._lock:
+            self._store.clear()
+
+    def __len__(self) -> int:
+        return len(self._store)
@@ -1,4 +1,7 @@
 import asyncio
+import heapq
+import re
+from operator import itemgetter
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 import logging
@@ -11,11 +14,36 @@ from models.database import get_db
 
 logger = logging.getLogger(__name__)
 
+# Ranking keys per scenario, looked up by the validated sort_by/metric value
+POST_SORT_KEYS = {
+    "score": lambda x: x.get('score', 0),
+    "comments": lambda x: x.get('num_comments', 0),
+    "date": lambda x: x.get('created_utc', 0),
+}
+POPULARITY_KEYS = {
+    "score": itemgetter('score'),
+    "comments": itemgetter('num_comments'),
+    "upvote_ratio": itemgetter('upvote_ratio'),
+}
+COMMENT_SORT_KEYS = {
+    "score": itemgetter('score'),
+    "date": itemgetter('created_utc'),
+    "length": lambda x: len(x['body']),
+}
+USER_SORT_KEYS = {
+    "total_score": itemgetter('total_score'),
+    "post_count": itemgetter('post_count'),
+    "comment_count": itemgetter('comment_count'),
+}
+
 class DataCollector:
     """
     Advanced Reddit data collection service with comprehensive search and filtering
     """
     
+    # Max subreddits fetched from Reddit at once in multi-subreddit scenarios
+    SUBREDDIT_FETCH_CONCURRENCY = 8
+    
     def __init__(self):
         self.reddit_client = AsyncRedditClient()
         self.analytics = AnalyticsService()
@@ -37,8 +65,8 @@ class DataCollector:
         Args:
             subreddit: Subreddit name
             keywords: List of keywords to search for
-            date_from: Start date
-            date_to: End date
+            date_from: Start date (inclusive)
+            date_to: End date (exclusive)
             limit: Number of posts to return
             sort_by: Sort criteria (score, comments, date)
         """
@@ -77,27 +105,22 @@ class DataCollector:
                 debug=True  # Enable debugging to understand filtering
             )
             
-            # Additional keyword filtering (since we're using OR search)
-            keyword_filtered_posts = []
-            for post in filtered_posts:
-                title_text = post.get('title', '').lower()
-                content_text = (post.get('selftext', '') or '').lower()
-                combined_text = f"{title_text} {content_text}"
-                
-                # Check if ANY keyword appears (OR logic)
-                if any(keyword.lower() in combined_text for keyword in keywords):
-                    keyword_filtered_posts.append(post)
-            
-            # Sort by specified criteria
-            if sort_by == "score":
-                keyword_filtered_posts.sort(key=lambda x: x.get('score', 0), reverse=True)
-            elif sort_by == "comments":
-                keyword_filtered_posts.sort(key=lambda x: x.get('num_comments', 0), reverse=True)
-            elif sort_by == "date":
-                keyword_filtered_posts.sort(key=lambda x: x.get('created_utc', 0), reverse=True)
+            # Additional keyword filtering (since we're using OR search):
+            # one case-insensitive alternation instead of lowercasing every post
+            if keywords:
+                keyword_pattern = re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)
+                keyword_filtered_posts = [
+                    post for post in filtered_posts
+                    if keyword_pattern.search(f"{post.get('title', '')} {post.get('selftext', '') or ''}")
+                ]
+            else:
+                keyword_filtered_posts = []
             
-            # Limit results
-            final_results = keyword_filtered_posts[:limit]
+            # Rank by specified criteria and limit results
+            if sort_by in POST_SORT_KEYS:
+                final_results = heapq.nlargest(limit, keyword_filtered_posts, key=POST_SORT_KEYS[sort_by])
+            else:
+                final_results = keyword_filtered_posts[:limit]
             
             logger.info(f"Final results: {len(final_results)} posts after keyword + date filtering")
             return final_results
@@ -124,24 +147,23 @@ class DataCollector:
             final_limit: Final number of trending posts to return
         """
         try:
-            all_trending_posts = []
+            semaphore = asyncio.Semaphore(self.SUBREDDIT_FETCH_CONCURRENCY)
             
-            # Get hot/rising posts from each subreddit
-            for subreddit in subreddits:
+            async def fetch_trending(reddit, subreddit: str) -> List[Dict[str, Any]]:
                 try:
-                    async with self.reddit_client as reddit:
-                        # Get hot posts (trending now)
-                        hot_posts = await reddit.get_subreddit_posts(
-                            subreddit_name=subreddit,
-                            sort_type="hot",
-                            limit=limit_per_subreddit // 2
-                        )
-                        
-                        # Get rising posts (gaining momentum)
-                        rising_posts = await reddit.get_subreddit_posts(
-                            subreddit_name=subreddit,
-                            sort_type="rising",
-                            limit=limit_per_subreddit // 2
+                    async with semaphore:
+                        # Hot posts (trending now) and rising posts (gaining momentum)
+                        hot_posts, rising_posts = await asyncio.gather(
+                            reddit.get_subreddit_posts(
+                                subreddit_name=subreddit,
+                                sort_type="hot",
+                                limit=limit_per_subreddit // 2
+                            ),
+                            reddit.get_subreddit_posts(
+                                subreddit_name=subreddit,
+                                sort_type="rising",
+                                limit=limit_per_subreddit // 2
+                            )
                         )
                     
                     # Combine and add trending score
@@ -153,11 +175,18 @@ class DataCollector:
                         post['trending_score'] = trending_score
                         post['source_subreddit'] = subreddit
                     
-                    all_trending_posts.extend(subreddit_posts)
+                    return subreddit_posts
                     
                 except Exception as e:
                     logger.warning(f"Error getting posts from r/{subreddit}: {e}")
-                    continue
+                    return []
+            
+            # Fetch all subreddits concurrently, in subreddit order
+            async with self.reddit_client as reddit:
+                per_subreddit = await asyncio.gather(
+                    *(fetch_trending(reddit, subreddit) for subreddit in subreddits)
+                )
+            all_trending_posts = [post for posts in per_subreddit for post in posts]
             
             # Remove duplicates and sort by trending score
             seen_ids = set()
@@ -167,9 +196,8 @@ class DataCollector:
                     seen_ids.add(post['reddit_id'])
                     unique_posts.append(post)
             
-            # Sort by trending score and return top results
-            unique_posts.sort(key=lambda x: x['trending_score'], reverse=True)
-            result = unique_posts[:final_limit]
+            # Keep only the top results by trending score (same order as a full sort)
+            result = heapq.nlargest(final_limit, unique_posts, key=itemgetter('trending_score'))
             
             logger.info(f"Found {len(result)} trending posts across {len(subreddits)} subreddits")
             return result
@@ -248,14 +276,9 @@ class DataCollector:
                 return None
             
             # Find most popular by specified metric
-            if metric == "score":
-                most_popular = max(today_posts, key=lambda x: x['score'])
-            elif metric == "comments":
-                most_popular = max(today_posts, key=lambda x: x['num_comments'])
-            elif metric == "upvote_ratio":
-                most_popular = max(today_posts, key=lambda x: x['upvote_ratio'])
-            else:
+            if metric not in POPULARITY_KEYS:
                 raise ValueError(f"Invalid metric: {metric}")
+            most_popular = max(today_posts, key=POPULARITY_KEYS[metric])
             
             logger.info(f"Found most popular post in r/{subreddit} today by {metric}")
             return most_popular
@@ -349,12 +372,8 @@ class DataCollector:
                 filtered_comments = keyword_filtered
             
             # Sort comments
-            if sort_by == "score":
-                filtered_comments.sort(key=lambda x: x['score'], reverse=True)
-            elif sort_by == "date":
-                filtered_comments.sort(key=lambda x: x['created_utc'], reverse=True)
-            elif sort_by == "length":
-                filtered_comments.sort(key=lambda x: len(x['body']), reverse=True)
+            if sort_by in COMMENT_SORT_KEYS:
+                filtered_comments.sort(key=COMMENT_SORT_KEYS[sort_by], reverse=True)
             
             result = filtered_comments[:limit]
             logger.info(f"Found {len(result)} comments matching criteria")
@@ -440,12 +459,8 @@ class DataCollector:
                 user_list.append(stats)
             
             # Sort by specified metric
-            if metric == "total_score":
-                user_list.sort(key=lambda x: x['total_score'], reverse=True)
-            elif metric == "post_count":
-                user_list.sort(key=lambda x: x['post_count'], reverse=True)
-            elif metric == "comment_count":
-                user_list.sort(key=lambda x: x['comment_count'], reverse=True)
+            if metric in USER_SORT_KEYS:
+                user_list.sort(key=USER_SORT_KEYS[metric], reverse=True)
             
             result = user_list[:limit]
             logger.info(f"Found top {len(result)} users by {metric}")
@@ -17,7 +17,8 @@ import hashlib
 import json
 import os
 import logging
-from typing import Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 
@@ -118,6 +119,41 @@ class PaddleService:
                 }
             }
         }
+        
+        # Long-lived HTTP client opened by connect() (None: one client per call)
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Reverse index for webhook price lookups (first tier wins on a shared ID)
+        self._tier_by_price_id = {}
+        for tier, config in self.tier_config.items():
+            self._tier_by_price_id.setdefault(config["paddle_price_id"], tier)
+    
+    # ========================================================================
+    # HTTP CLIENT LIFECYCLE
+    # ========================================================================
+    
+    async def connect(self) -> "PaddleService":
+        """Open a pooled HTTP client reused by all Paddle API calls until close()"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60)
+            )
+        return self
+    
+    async def close(self):
+        """Close the pooled HTTP client opened by connect()"""
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+    
+    @asynccontextmanager
+    async def _http(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Yield the pooled client, or a short-lived one when not connected"""
+        if self._client is not None:
+            yield self._client
+        else:
+            async with httpx.AsyncClient() as client:
+                yield client
     
     # ========================================================================
     # CUSTOMER MANAGEMENT
@@ -148,7 +184,7 @@ class PaddleService:
                 }
             }
             
-            async with httpx.AsyncClient() as client:
+            async with self._http() as client:
                 response = await client.post(
                     f"{self.base_url}/customers",
                     json=payload,
@@ -177,7 +213,7 @@ class PaddleService:
             Paddle customer data
         """
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._http() as client:
                 response = await client.get(
                     f"{self.base_url}/customers/{customer_id}",
                     headers=self.headers
@@ -244,7 +280,7 @@ class PaddleService:
                     "resume_immediately": False
                 }
             
-            async with httpx.AsyncClient() as client:
+            async with self._http() as client:
                 response = await client.post(
                     f"{self.base_url}/subscriptions",
                     json=payload,
@@ -298,7 +334,7 @@ class PaddleService:
                 }
             }
             
-            async with httpx.AsyncClient() as client:
+            async with self._http() as client:
                 response = await client.patch(
                     f"{self.base_url}/subscriptions/{subscription_id}",
                     json=payload,
@@ -331,7 +367,7 @@ class PaddleService:
                 }
             }
             
-            async with httpx.AsyncClient() as client:
+            async with self._http() as client:
                 response = await client.patch(
                     f"{self.base_url}/subscriptions/{subscription_id}",
                     json=payload,
@@ -357,7 +393,7 @@ class PaddleService:
             Subscription data
         """
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._http() as client:
                 response = await client.get(
                     f"{self.base_url}/subscriptions/{subscription_id}",
                     headers=self.headers
@@ -428,7 +464,7 @@ class PaddleService:
                     "display_mode": "overlay"
                 }
             
-            async with httpx.AsyncClient() as client:
+            async with self._http() as client:
                 response = await client.post(
                     f"{self.base_url}/transactions",
                     json=payload,
@@ -481,15 +517,12 @@ class PaddleService:
                 logger.error("No h1 signature found in Paddle-Signature header")
                 return False
             
-            # Construct signed payload for verification
-            signed_payload = f"{timestamp}.{payload.decode()}"
-            
-            # Calculate expected signature
-            expected_signature = hmac.new(
-                self.webhook_secret.encode(),
-                signed_payload.encode(),
-                hashlib.sha256
-            ).hexdigest()
+            # Calculate expected signature over "timestamp.payload", feeding the
+            # raw body straight to the digest instead of copying it into a str
+            signer = hmac.new(self.webhook_secret.encode(), digestmod=hashlib.sha256)
+            signer.update(f"{timestamp}.".encode())
+            signer.update(payload)
+            expected_signature = signer.hexdigest()
             
             # Verify signature
             is_valid = hmac.compare_digest(webhook_signature, expected_signature)
@@ -590,10 +623,7 @@ class PaddleService:
         Returns:
             Matching SubscriptionTier or None
         """
-        for tier, config in self.tier_config.items():
-            if config["paddle_price_id"] == price_id:
-                return tier
-        return None
+        return self._tier_by_price_id.get(price_id)
     
     def is_configured(self) -> bool:
         """Check if Paddle service is properly configured
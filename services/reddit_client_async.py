@@ -1,5 +1,6 @@
 import asyncpraw
 import asyncio
+import aiohttp
 import os
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
@@ -24,24 +25,54 @@ class AsyncRedditClient:
             raise ValueError("Reddit API credentials not found in environment variables")
         
         self._reddit = None
+        self._persistent = False
+        self._connect_lock = asyncio.Lock()
     
     async def __aenter__(self):
-        """Async context manager entry"""
-        await self._initialize_client()
+        """Async context manager entry (reuses the session once connected)"""
+        if not self._persistent:
+            await self._initialize_client()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit"""
+        """Async context manager exit (long-lived sessions stay open)"""
+        if self._reddit and not self._persistent:
+            await self._reddit.close()
+            self._reddit = None
+    
+    async def connect(self) -> "AsyncRedditClient":
+        """
+        Open a long-lived client session shared by all callers until close().
+        Safe to call repeatedly; only the first call creates the session.
+        """
+        if self._persistent:
+            return self
+        async with self._connect_lock:
+            if not self._persistent:
+                await self._initialize_client(
+                    session=aiohttp.ClientSession(
+                        connector=aiohttp.TCPConnector(limit=64, keepalive_timeout=60),
+                        timeout=aiohttp.ClientTimeout(total=None)
+                    )
+                )
+                self._persistent = True
+        return self
+    
+    async def close(self):
+        """Close the long-lived client session opened by connect()"""
         if self._reddit:
             await self._reddit.close()
+        self._reddit = None
+        self._persistent = False
     
-    async def _initialize_client(self):
+    async def _initialize_client(self, session: Optional[aiohttp.ClientSession] = None):
         """Initialize the AsyncPRAW Reddit client"""
         try:
             self._reddit = asyncpraw.Reddit(
                 client_id=self.client_id,
                 client_secret=self.client_secret,
-                user_agent=self.user_agent
+                user_agent=self.user_agent,
+                requestor_kwargs={"session": session} if session else None
             )
             
             # Test the connection
@@ -9,4 +9,4 @@ fi
 PORT=${PORT:-8000}
 
 # Start the FastAPI application with Uvicorn
-uvicorn main:app --host 0.0.0.0 --port $PORT --workers 1
+uvicorn main:app --host 0.0.0.0 --port $PORT --workers 1 --loop uvloop